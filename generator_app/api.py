@@ -1,4 +1,6 @@
-from typing import Any
+from typing import Any, Iterator
+import asyncio
+import json
 import os
 # Imports que funcionan tanto localmente (generator_app) como en Docker (/app)
 import sys
@@ -6,10 +8,13 @@ from pathlib import Path
 from dotenv import load_dotenv
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from loguru import logger
 
 from generator_app.helpers.external_model_source import ExternalModel
 from generator_app.helpers.finned_tunned_model import FinnedTunnedModel
+from generator_app.helpers.batch_scheduler import GenerationBatcher, SCHEDULER_MAX_BATCH_SIZE
+from generator_app.helpers.generation_cache import GenerationCache
 from generator_app.schemas.supported_models import SupportedModels
 from generator_app import __version__, schemas
 from generator_app.config import settings
@@ -20,6 +25,14 @@ MODEL_VERSION = "0.1.0"
 
 api_router = APIRouter()
 
+# Scheduler compartido: agrupa textos de solicitudes concurrentes al modelo fine-tuned
+generation_batcher = GenerationBatcher(
+    lambda batch: FinnedTunnedModel().generate_batch(batch, batch_size=SCHEDULER_MAX_BATCH_SIZE)
+)
+
+# Caché persistente de generaciones reproducibles (seed o deterministic)
+generation_cache = GenerationCache()
+
 
 # Ruta para verificar que la API se esté ejecutando correctamente
 @api_router.get("/health", response_model=schemas.Health, status_code=200)
@@ -33,27 +46,76 @@ def health() -> dict:
 
     return health.dict()
 
+@api_router.get("/scheduler/stats", response_model=schemas.SchedulerStats, status_code=200)
+def scheduler_stats() -> dict:
+    """
+    Profundidad de cola y estadísticas de batching del modelo fine-tuned
+    """
+    return generation_batcher.stats()
+
+@api_router.get("/cache/stats", response_model=schemas.CacheStats, status_code=200)
+def cache_stats() -> dict:
+    """
+    Hit ratio y bytes almacenados del caché de generaciones
+    """
+    return generation_cache.stats()
+
 @api_router.post("/generate", response_model=schemas.GenerationResults, status_code=200)
 async def generate(input_data: schemas.MultipleDataInputs) -> Any:
     texts = [str(t) for t in input_data.inputs]
     model_name = input_data.model
+    seed, deterministic = input_data.seed, input_data.deterministic
     logger.info(f"Making generation on inputs: {texts}")
 
     try:
         # Call OpenAI API to generate text based on classification
         if model_name not in SupportedModels._value2member_map_:
                 raise HTTPException(status_code=400, detail=f"Modelo no soportado: {model_name}")
-        generated_texts = []
-        for i, text in enumerate(texts):
-            if model_name == SupportedModels.OLLAMA_FINNED_TUNNED.value:
-                model = FinnedTunnedModel()
+        finned_tunned = model_name == SupportedModels.OLLAMA_FINNED_TUNNED.value
+        # Con do_sample=True la salida solo es reproducible con seed o en modo determinista.
+        # Los proveedores externos no reciben el seed: solo es cacheable el modo determinista
+        # de los proveedores que lo respetan
+        if not finned_tunned:
+            model = ExternalModel(
+                model_name=model_name, deterministic=deterministic
+            )
+            use_cache = generation_cache.enabled and deterministic and model.supports_deterministic
+        else:
+            use_cache = generation_cache.enabled and (deterministic or seed is not None)
+
+        keys, cached = [], {}
+        if use_cache:
+            if finned_tunned:
+                keys = [FinnedTunnedModel.cache_key(t, seed, deterministic) for t in texts]
             else:
-                model = ExternalModel(
-                    model_name=model_name
+                keys = [model.cache_key(t) for t in texts]
+            cached = generation_cache.get_many(keys)
+        missing = [i for i in range(len(texts)) if not use_cache or keys[i] not in cached]
+        missing_texts = [texts[i] for i in missing]
+
+        fresh = []
+        if missing_texts and finned_tunned:
+            if seed is None and not deterministic:
+                # Cada texto entra a la cola del scheduler, que los agrupa con los de
+                # otras solicitudes y decodifica fuera del event loop
+                fresh = list(await asyncio.gather(
+                    *(generation_batcher.submit(text) for text in missing_texts)
+                ))
+            else:
+                # En el hilo de generación del scheduler: el RNG global no se comparte
+                # con batches en curso, así que la salida es reproducible (y cacheable)
+                fresh = await generation_batcher.run_exclusive(
+                    lambda: FinnedTunnedModel().generate_batch(missing_texts, seed=seed, deterministic=deterministic)
                 )
+        elif missing_texts:
+            # Fan-out concurrente con clientes async compartidos (límite EXTERNAL_MAX_CONCURRENCY)
+            fresh = await model.agenerate_many(missing_texts)
 
-            generated_text = model.generate(text)
-            generated_texts.append(generated_text)
+        generated_texts = [cached.get(k) for k in keys] if use_cache else [None] * len(texts)
+        for i, out in zip(missing, fresh):
+            generated_texts[i] = out
+        if use_cache:
+            generation_cache.put_many({keys[i]: out for i, out in zip(missing, fresh)})
     except Exception as e:
         logger.warning(f"Generation error: {e}")
         raise HTTPException(status_code=500, detail=f"Generation failed: {e}")
@@ -71,6 +133,7 @@ async def generate(input_data: schemas.MultipleDataInputs) -> Any:
         "version": MODEL_VERSION,
         "metadata": {
             "model_version": MODEL_VERSION,
+            "cache_hits": len(texts) - len(missing),
             "metrics": {
                 "accuracy": metrics["accuracy"],
                 "recall": metrics["recall"],
@@ -80,3 +143,48 @@ async def generate(input_data: schemas.MultipleDataInputs) -> Any:
             },
         },
     }
+
+
+def _sse(data: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _stream_events(text: str, loop: asyncio.AbstractEventLoop) -> Iterator[str]:
+    # Generador síncrono: StreamingResponse lo itera en el threadpool, así que
+    # la carga del modelo y la espera de cada token no bloquean el event loop.
+    # La decodificación corre en el hilo de generación del scheduler, entre batches:
+    # el modelo, el caché del prefijo y el RNG nunca se usan desde dos hilos a la vez
+    def _submit(fn):
+        return asyncio.run_coroutine_threadsafe(generation_batcher.run_exclusive(fn), loop)
+
+    generated = []
+    try:
+        for fragment in FinnedTunnedModel().generate_stream(text, submit=_submit):
+            generated.append(fragment)
+            yield _sse({"token": fragment})
+    except Exception as e:
+        logger.warning(f"Streaming generation error: {e}")
+        yield _sse({"detail": f"Generation failed: {e}"}, event="error")
+        return
+    yield _sse({"generation": "".join(generated).strip(), "version": MODEL_VERSION}, event="end")
+
+
+@api_router.post("/generate/stream", status_code=200)
+async def generate_stream(input_data: schemas.GenerationRequest) -> StreamingResponse:
+    """
+    Generación con streaming (Server-Sent Events) para el modelo fine-tuned.
+    Emite un evento `data: {"token": ...}` por fragmento decodificado y cierra
+    con `event: end` que contiene el resumen completo.
+    """
+    if input_data.model != SupportedModels.OLLAMA_FINNED_TUNNED.value:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Streaming solo disponible para {SupportedModels.OLLAMA_FINNED_TUNNED.value}",
+        )
+    logger.info(f"Streaming generation on input of length {len(input_data.prompt)}")
+    return StreamingResponse(
+        _stream_events(str(input_data.prompt), asyncio.get_running_loop()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
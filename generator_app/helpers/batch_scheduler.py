@@ -0,0 +1,187 @@
+import os
+import asyncio
+import time
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+from loguru import logger
+
+
+# Límites del micro-batching: se despacha un batch al llegar a MAX_BATCH_SIZE
+# textos o al cumplirse MAX_WAIT_MS desde el primer texto en cola
+SCHEDULER_MAX_BATCH_SIZE = int(os.getenv("SCHEDULER_MAX_BATCH_SIZE", os.getenv("GEN_BATCH_SIZE", "8")))
+SCHEDULER_MAX_WAIT_MS = float(os.getenv("SCHEDULER_MAX_WAIT_MS", "20"))
+
+
+class GenerationBatcher:
+    """
+    Background scheduler that merges single-text generation requests coming
+    from concurrent callers into batches.
+
+    Callers ``await submit(text)``; a worker task collects queued texts until
+    ``max_batch_size`` is reached or ``max_wait_ms`` has elapsed since the
+    first one, runs ``generate_fn`` on a dedicated thread so the event loop
+    stays free, and resolves each caller's future with its own output.
+    """
+
+    def __init__(
+        self,
+        generate_fn: Callable[[List[str]], List[str]],
+        max_batch_size: int = SCHEDULER_MAX_BATCH_SIZE,
+        max_wait_ms: float = SCHEDULER_MAX_WAIT_MS,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size debe ser >= 1")
+        self._generate_fn = generate_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        self._in_flight = 0
+        self._batches_total = 0
+        self._requests_total = 0
+        self._errors_total = 0
+        self._batch_sizes: Counter = Counter()
+        self._queue_wait_ms_total = 0.0
+        self._batch_ms_total = 0.0
+
+    def _ensure_started(self) -> None:
+        """Create the queue and worker lazily inside the running event loop."""
+        if self._worker is None or self._worker.done():
+            if self._executor is None:
+                # Un solo hilo: el modelo no se comparte entre decodificaciones simultáneas
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="generation")
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, text: str) -> str:
+        """
+        Queue a text for generation and wait for its result.
+
+        Args:
+            text (str): Input text to summarize
+
+        Returns:
+            str: Generated summary
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def run_exclusive(self, fn: Callable[[], Any]) -> Any:
+        """
+        Run ``fn`` on the generation thread, between batches.
+
+        Seeded and deterministic generation reseeds the process-global torch RNG;
+        running it on the same single thread as the batches guarantees nothing
+        else samples from that RNG meanwhile, so the output is reproducible.
+        """
+        self._ensure_started()
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn)
+
+    async def _next_batch(self) -> List[Tuple[str, asyncio.Future, float]]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Los clientes que cancelaron mientras esperaban no ocupan lugar en el batch
+        return [item for item in batch if not item[1].cancelled()]
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                continue
+
+            texts = [text for text, _, _ in batch]
+            started = time.perf_counter()
+            with self._stats_lock:
+                self._in_flight = len(batch)
+                self._queue_wait_ms_total += sum((started - queued) * 1000.0 for _, _, queued in batch)
+
+            try:
+                results = await loop.run_in_executor(self._executor, self._generate_fn, texts)
+                if len(results) != len(texts):
+                    raise RuntimeError(f"generate_fn devolvió {len(results)} resultados para {len(texts)} textos")
+            except asyncio.CancelledError:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError("Generation scheduler stopped"))
+                raise
+            except Exception as e:
+                logger.warning(f"Batch generation error ({len(batch)} textos): {e}")
+                with self._stats_lock:
+                    self._errors_total += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+            finally:
+                with self._stats_lock:
+                    self._in_flight = 0
+                    self._batches_total += 1
+                    self._requests_total += len(batch)
+                    self._batch_sizes[len(batch)] += 1
+                    self._batch_ms_total += (time.perf_counter() - started) * 1000.0
+
+    def stats(self) -> dict:
+        """
+        Snapshot of queue depth and batching statistics.
+
+        Returns:
+            dict: Counters useful to tune ``max_batch_size``/``max_wait_ms``
+        """
+        with self._stats_lock:
+            batches = self._batches_total
+            requests = self._requests_total
+            return {
+                "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+                "in_flight": self._in_flight,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "batches_total": batches,
+                "requests_total": requests,
+                "errors_total": self._errors_total,
+                "avg_batch_size": requests / batches if batches else 0.0,
+                "avg_queue_wait_ms": self._queue_wait_ms_total / requests if requests else 0.0,
+                "avg_batch_ms": self._batch_ms_total / batches if batches else 0.0,
+                "batch_size_histogram": {str(k): v for k, v in sorted(self._batch_sizes.items())},
+            }
+
+    async def stop(self) -> None:
+        """Cancel the worker task, fail pending callers and release the worker thread."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future, _ = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("Generation scheduler stopped"))
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -1,6 +1,9 @@
 from enum import Enum
 import os
-from typing import Optional
+import asyncio
+import threading
+import weakref
+from typing import List, Optional
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -8,53 +11,141 @@ import openai
 import anthropic
 
 from generator_app.schemas.supported_models import SupportedModels
+from generator_app.helpers.generation_cache import make_cache_key
+
+
+load_dotenv()
+
+# Fan-out, reintentos (429/5xx con backoff exponencial del SDK) y timeout por solicitud
+EXTERNAL_MAX_CONCURRENCY = int(os.getenv("EXTERNAL_MAX_CONCURRENCY", "8"))
+EXTERNAL_MAX_RETRIES = int(os.getenv("EXTERNAL_MAX_RETRIES", "3"))
+EXTERNAL_TIMEOUT_S = float(os.getenv("EXTERNAL_TIMEOUT_S", "120"))
+
+# Clientes de larga vida: reutilizan el pool de conexiones entre solicitudes.
+_clients = {}
+# Los asíncronos van por event loop porque su pool queda ligado al loop; la app los
+# cierra en su shutdown (aclose_clients) y la entrada desaparece con el loop.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def _new_client(provider: str, api_key: Optional[str], base_url: Optional[str], asynchronous: bool):
+    kwargs = dict(api_key=api_key, base_url=base_url, max_retries=EXTERNAL_MAX_RETRIES, timeout=EXTERNAL_TIMEOUT_S)
+    if provider == "anthropic":
+        return anthropic.AsyncAnthropic(**kwargs) if asynchronous else anthropic.Anthropic(**kwargs)
+    return openai.AsyncOpenAI(**kwargs) if asynchronous else openai.OpenAI(**kwargs)
+
+
+def _get_client(provider: str, api_key: Optional[str], base_url: Optional[str], asynchronous: bool):
+    key = (provider, api_key, base_url)
+    with _clients_lock:
+        clients = _async_clients.setdefault(asyncio.get_running_loop(), {}) if asynchronous else _clients
+        client = clients.get(key)
+        if client is None:
+            client = clients[key] = _new_client(provider, api_key, base_url, asynchronous)
+        return client
+
+
+async def aclose_clients() -> None:
+    """Close the pooled async clients of the running event loop (call on app shutdown)."""
+    with _clients_lock:
+        clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        try:
+            await client.close()
+        except Exception:
+            pass
 
 
 class ExternalModel:
-    def __init__(self, model_name: SupportedModels):
-        print('aca3')
-        print('model_name:', model_name)
+    def __init__(self, model_name: SupportedModels, base_url: Optional[str] = None, deterministic: bool = False):
         self.model_name = model_name
-        load_dotenv()
+        self.deterministic = deterministic
         self.openAIKey = os.getenv("OPENAI_API_KEY")
         self.anthropicKey = os.getenv("ANTHROPIC_API_KEY")
-        print(self.anthropicKey)
         self.system_prompt = os.getenv("SYSTEM_PROMPT")
         self.user_prefix = os.getenv("USER_PREFIX")
+        # None -> URL del proveedor (o ANTHROPIC_BASE_URL / OPENAI_BASE_URL)
+        self.base_url = base_url
 
+    def cache_key(self, text: str) -> str:
+        """
+        Generation cache key for ``text`` with this model, prompts and request parameters.
+        The providers are not sent a seed, so only deterministic requests are cacheable.
+        """
+        params = self._anthropic_request("") if self._provider() == "anthropic" else self._openai_request("")
+        params.pop("messages", None)
+        params.pop("input", None)
+        return make_cache_key(
+            model=self.model_name, system_prompt=self.system_prompt, user_prefix=self.user_prefix, text=text,
+            gen_cfg=params, deterministic=self.deterministic,
+        )
 
-    def generate(self, prompt: str) -> str:
-        print('aca4')
+    @property
+    def supports_deterministic(self) -> bool:
+        """
+        Whether ``deterministic`` reaches the provider. Only the Anthropic request sets
+        temperature 0.0; the OpenAI Responses request has no sampling controls.
+        """
+        return self._provider() == "anthropic"
 
-        """Generate response using the specified external model."""
-        print('model_name:', self.model_name)
-        print('SupportedModels.CLAUDE_SONNET_4.value:', SupportedModels.CLAUDE_SONNET_4.value)
+    def _provider(self) -> str:
         if self.model_name == SupportedModels.CLAUDE_SONNET_4.value:
-            print('aca5')
+            return "anthropic"
+        elif self.model_name == SupportedModels.CHATGPT_4.value:
+            return "openai"
+        raise ValueError(f"Unsupported model: {self.model_name}")
 
+    def generate(self, prompt: str) -> str:
+        """Generate response using the specified external model."""
+        if self._provider() == "anthropic":
             return self._call_anthropic_api(prompt)
-        elif self.model_name == SupportedModels.CHATGPT_4.value:
-            print('aca6')
+        return self._call_openai_api(prompt)
+
+    async def agenerate(self, prompt: str) -> str:
+        """Async version of ``generate`` using the pooled async clients."""
+        if self._provider() == "anthropic":
+            return await self._acall_anthropic_api(prompt)
+        return await self._acall_openai_api(prompt)
+
+    async def agenerate_many(self, prompts: List[str], concurrency: int = EXTERNAL_MAX_CONCURRENCY) -> List[str]:
+        """
+        Generate responses for several prompts concurrently, keeping at most
+        ``concurrency`` requests in flight. Results keep the input order.
+        """
+        self._provider()
+        semaphore = asyncio.Semaphore(max(1, concurrency))
 
-            return self._call_openai_api(prompt)
-        else:
-            raise ValueError(f"Unsupported model: {self.model_name}")
+        async def _one(prompt: str) -> str:
+            async with semaphore:
+                return await self.agenerate(prompt)
+
+        return list(await asyncio.gather(*(_one(p) for p in prompts)))
+
+    def _anthropic_request(self, prompt: str) -> dict:
+        return dict(
+            model=self.model_name,
+            max_tokens=1000,
+            temperature=0.0 if self.deterministic else 0.7,
+            system=self.system_prompt,
+            messages=[
+                {"role": "user", "content": self.user_prefix + prompt}
+            ]
+        )
+
+    def _openai_request(self, prompt: str) -> dict:
+        return dict(
+            model=self.model_name,
+            input= self.system_prompt + self.user_prefix + prompt,
+            reasoning={ "effort": "low" },
+            text={ "verbosity": "low" },
+        )
 
     def _call_anthropic_api(self, prompt: str) -> str:
         """Call Anthropic Claude API."""
         try:
-            client = anthropic.Anthropic(api_key=self.anthropicKey)
-            
-            message = client.messages.create(
-                model=self.model_name,
-                max_tokens=1000,
-                temperature=0.7,
-                system=self.system_prompt,
-                messages=[
-                    {"role": "user", "content": self.user_prefix + prompt}
-                ]
-            )
-            
+            client = _get_client("anthropic", self.anthropicKey, self.base_url, asynchronous=False)
+            message = client.messages.create(**self._anthropic_request(prompt))
             return message.content[0].text
         except Exception as e:
             raise Exception(f"Error calling Anthropic API: {str(e)}")
@@ -62,17 +153,26 @@ class ExternalModel:
     def _call_openai_api(self, prompt: str) -> str:
         """Call OpenAI GPT API."""
         try:
-            client = openai.OpenAI(api_key=self.openAIKey)
-            
-            result = client.responses.create(
-                model=self.model_name,
-                input= self.system_prompt + self.user_prefix + prompt,
-                reasoning={ "effort": "low" },
-                text={ "verbosity": "low" },
-            )
-            output_text = result.output_text
-
-            return output_text
-    
+            client = _get_client("openai", self.openAIKey, self.base_url, asynchronous=False)
+            result = client.responses.create(**self._openai_request(prompt))
+            return result.output_text
+        except Exception as e:
+            raise Exception(f"Error calling OpenAI API: {str(e)}")
+
+    async def _acall_anthropic_api(self, prompt: str) -> str:
+        """Call Anthropic Claude API (async)."""
+        try:
+            client = _get_client("anthropic", self.anthropicKey, self.base_url, asynchronous=True)
+            message = await client.messages.create(**self._anthropic_request(prompt))
+            return message.content[0].text
+        except Exception as e:
+            raise Exception(f"Error calling Anthropic API: {str(e)}")
+
+    async def _acall_openai_api(self, prompt: str) -> str:
+        """Call OpenAI GPT API (async)."""
+        try:
+            client = _get_client("openai", self.openAIKey, self.base_url, asynchronous=True)
+            result = await client.responses.create(**self._openai_request(prompt))
+            return result.output_text
         except Exception as e:
-            raise Exception(f"Error calling OpenAI API: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error calling OpenAI API: {str(e)}")
@@ -1,11 +1,26 @@
 import os, json
+import copy
+import shutil
+import hashlib
+import time
 from pathlib import Path
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import (
+    AutoTokenizer,
+    AutoModelForCausalLM,
+    DynamicCache,
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextIteratorStreamer,
+)
 from peft import PeftModel
 from huggingface_hub import login
 from dotenv import load_dotenv
 import threading
+from concurrent.futures import Future, wait
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from generator_app.helpers.generation_cache import make_cache_key
 
 
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
@@ -34,6 +49,40 @@ GEN_CFG = dict(
     repetition_penalty=1.015,
 )
 
+# Número máximo de prompts que se decodifican juntos en un solo model.generate
+GEN_BATCH_SIZE = int(os.getenv("GEN_BATCH_SIZE", "8"))
+
+# Carga de pesos sin la copia extra en CPU: low_cpu_mem_usage lee los shards
+# safetensors (mapeados en memoria) directo a los parámetros, sin inicializarlos antes
+MMAP_WEIGHTS = os.getenv("MMAP_WEIGHTS", "1") == "1"
+
+# Mergea el adapter LoRA en los pesos base y guarda un snapshot safetensors
+# en MODEL_PATH/<MODEL_NAME>__merged; los siguientes arranques cargan ese snapshot
+MERGE_LORA = os.getenv("MERGE_LORA", "0") == "1"
+# Huella del adapter con la que se construyó el snapshot; si cambia, el snapshot se reconstruye
+ADAPTER_FINGERPRINT_FILE = "adapter_fingerprint.txt"
+
+# Modo de inferencia en CPU: fp32 (por defecto), bf16 o int8 (cuantización dinámica de nn.Linear)
+CPU_INFERENCE_MODE = os.getenv("CPU_INFERENCE_MODE", "fp32").lower()
+# Fracción mínima de posiciones donde el token más probable coincide con fp32 en el self-check
+SELFCHECK_MIN_AGREEMENT = float(os.getenv("SELFCHECK_MIN_AGREEMENT", "0.9"))
+SELFCHECK_TEXT = (
+    "Participants with type 2 diabetes were randomly assigned to metformin or placebo for 12 weeks; "
+    "the primary outcome was change in HbA1c."
+)
+
+# Reutiliza los past-key-values del prefijo fijo (SYSTEM_PROMPT + USER_PREFIX)
+PREFIX_CACHE = os.getenv("PREFIX_CACHE", "1") == "1"
+
+class _StopOnEvent(StoppingCriteria):
+    """Stops ``model.generate`` once the given event is set (e.g. client disconnected)."""
+
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        return self.event.is_set()
+
 class FinnedTunnedModel:
     """
     Singleton class for fine-tuned model management.
@@ -42,6 +91,8 @@ class FinnedTunnedModel:
     _instance = None
     _lock = threading.Lock()
     _initialized = False
+    inference_mode_report = None
+    load_timings = None
 
     def __new__(cls):
         """
@@ -68,13 +119,21 @@ class FinnedTunnedModel:
                     if hf_token:
                         login(token=hf_token)
 
-                    print('hf_token')
-                    print(hf_token)
                     model, tokenizer, EOS_ID = self.load_model_and_tokenizer(MODEL_DIR, DEVICE)
                     self.model = model
                     self.tokenizer = tokenizer
                     self.EOS_ID = EOS_ID
+                    self._prefix_lock = threading.Lock()
+                    self._prefix_cache = None
+                    if PREFIX_CACHE:
+                        t0 = time.perf_counter()
+                        self._get_prefix_cache()
+                        self.load_timings["prefix_cache_s"] = time.perf_counter() - t0
+                    self.load_timings["warmup_s"] = self._warmup_first_token()
+                    # Solo tras un warmup exitoso: si falla, el error llega a /readyz y el
+                    # siguiente FinnedTunnedModel() vuelve a intentar la carga
                     FinnedTunnedModel._initialized = True
+                    print(f"Load timings: { {k: round(v, 2) for k, v in self.load_timings.items()} }")
                     print("FinnedTunnedModel singleton initialized successfully")
 
     def is_initialized(self):
@@ -92,14 +151,30 @@ class FinnedTunnedModel:
         Supports both LoRA models (with adapter_config.json) and merged models (without adapter_config.json).
         """
         hf_token = os.getenv("HUGGINGFACE_HUB_TOKEN")
+        timings = {}
+        self.load_timings = timings
         model_dir = str(Path(model_dir).resolve())
         cfg_path = Path(model_dir) / "adapter_config.json"
+        merged_dir = self.merged_snapshot_dir(model_dir)
+
+        adapter_fp = self.adapter_fingerprint(model_dir) if MERGE_LORA and cfg_path.exists() else None
+        if adapter_fp and (merged_dir / "config.json").exists():
+            if self.snapshot_fingerprint(merged_dir) == adapter_fp:
+                # Snapshot mergeado de un arranque anterior: se carga por la rama de modelo completo
+                print(f"Usando snapshot mergeado en {merged_dir}")
+                model_dir = str(merged_dir)
+                cfg_path = merged_dir / "adapter_config.json"
+            else:
+                print(f"Snapshot mergeado en {merged_dir} no corresponde al adapter actual; se reconstruye")
         
+        t0 = time.perf_counter()
         tok = AutoTokenizer.from_pretrained(model_dir, token=hf_token, use_fast=True, trust_remote_code=True)
         if tok.pad_token is None:
             tok.pad_token = tok.eos_token
         tok.padding_side = "left"
+        timings["tokenizer_s"] = time.perf_counter() - t0
         
+        t0 = time.perf_counter()
         if cfg_path.exists():
             # Load as LoRA model
             print(f"Cargando modelo LoRA desde {model_dir}")
@@ -108,23 +183,33 @@ class FinnedTunnedModel:
             if not base:
                 raise ValueError("adapter_config.json no contiene 'base_model_name_or_path'.")
 
-            base_model = AutoModelForCausalLM.from_pretrained(
+            base_model = self._to_device(AutoModelForCausalLM.from_pretrained(
                 base,
-                torch_dtype=torch.float16 if device.startswith("cuda") else torch.float32,
-                trust_remote_code=True
-            ).to(device)
+                **self._weights_kwargs(device),
+            ), device)
+            timings["weights_s"] = time.perf_counter() - t0
 
+            t0 = time.perf_counter()
             base_model.resize_token_embeddings(len(tok))
             model = PeftModel.from_pretrained(base_model, model_dir, is_trainable=False, local_files_only=True)
+            if MERGE_LORA:
+                model = model.merge_and_unload()
+                self.save_merged_snapshot(model, tok, merged_dir, adapter_fp)
+            timings["adapter_s"] = time.perf_counter() - t0
         else:
             # Load as merged/full model (no adapter_config.json)
             print(f"Cargando modelo mergeado completo desde {model_dir}")
-            model = AutoModelForCausalLM.from_pretrained(
+            model = self._to_device(AutoModelForCausalLM.from_pretrained(
                 model_dir,
-                torch_dtype=torch.float16 if device.startswith("cuda") else torch.float32,
-                trust_remote_code=True,
+                **self._weights_kwargs(device),
                 local_files_only=True
-            ).to(device)
+            ), device)
+            timings["weights_s"] = time.perf_counter() - t0
+
+        if not device.startswith("cuda"):
+            t0 = time.perf_counter()
+            model = self.apply_cpu_inference_mode(model, tok, CPU_INFERENCE_MODE)
+            timings["inference_mode_s"] = time.perf_counter() - t0
 
         model.config.pad_token_id = tok.pad_token_id
         eos_id = None
@@ -137,6 +222,179 @@ class FinnedTunnedModel:
 
         return model, tok, eos_id
 
+    @staticmethod
+    def _weights_kwargs(device: str) -> dict:
+        kwargs = dict(
+            torch_dtype=torch.float16 if device.startswith("cuda") else torch.float32,
+            trust_remote_code=True,
+        )
+        if MMAP_WEIGHTS:
+            kwargs["low_cpu_mem_usage"] = True
+        return kwargs
+
+    @staticmethod
+    def _to_device(model, device: str):
+        # En CPU los pesos ya quedan donde se cargaron; .to() solo aplica a GPU
+        if MMAP_WEIGHTS and device == "cpu":
+            return model
+        return model.to(device)
+
+    def _warmup_first_token(self) -> float:
+        """
+        Generate a single token on a tiny prompt so the first request doesn't
+        pay for lazy initializations (kernels, allocator, caches).
+
+        Returns:
+            float: Seconds spent in the warmup
+
+        Raises:
+            Exception: If the warmup generation fails; the model is then not marked as initialized
+        """
+        t0 = time.perf_counter()
+        inputs, extra = self._encode_single("warmup")
+        cfg = self._generation_config()
+        cfg["max_new_tokens"] = 1
+        with torch.inference_mode():
+            self.model.generate(**inputs, **cfg, **extra)
+        return time.perf_counter() - t0
+
+    @staticmethod
+    def merged_snapshot_dir(model_dir: str) -> Path:
+        """Directory of the merged snapshot for a LoRA model directory (sibling under MODEL_PATH)."""
+        model_dir = Path(model_dir)
+        return model_dir.parent / f"{model_dir.name}__merged"
+
+    @staticmethod
+    def adapter_fingerprint(model_dir: str) -> str:
+        """SHA-256 of the adapter config and weights in a LoRA model directory."""
+        digest = hashlib.sha256()
+        for name in ("adapter_config.json", "adapter_model.safetensors", "adapter_model.bin"):
+            path = Path(model_dir) / name
+            if not path.exists():
+                continue
+            digest.update(name.encode("utf-8"))
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def snapshot_fingerprint(merged_dir: Path) -> Optional[str]:
+        """Adapter fingerprint a merged snapshot was built from (None for snapshots without one)."""
+        try:
+            return (merged_dir / ADAPTER_FINGERPRINT_FILE).read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+
+    @staticmethod
+    def save_merged_snapshot(model, tok, merged_dir: Path, adapter_fp: Optional[str] = None) -> None:
+        """
+        Persist a merged model and its tokenizer as safetensors.
+
+        The snapshot is written to a temporary directory and renamed into
+        place, so an interrupted write never leaves a half-written snapshot
+        that a later start would pick up.
+
+        Args:
+            model: Model with the LoRA adapter already merged
+            tok: Tokenizer
+            merged_dir (Path): Destination directory
+            adapter_fp (str, optional): Fingerprint of the adapter that was merged
+        """
+        tmp_dir = merged_dir.with_name(merged_dir.name + ".tmp")
+        try:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            model.save_pretrained(tmp_dir, safe_serialization=True)
+            tok.save_pretrained(tmp_dir)
+            if adapter_fp:
+                (tmp_dir / ADAPTER_FINGERPRINT_FILE).write_text(adapter_fp, encoding="utf-8")
+            shutil.rmtree(merged_dir, ignore_errors=True)
+            tmp_dir.rename(merged_dir)
+            print(f"Snapshot mergeado guardado en {merged_dir}")
+        except Exception as e:
+            # El modelo mergeado en memoria sigue siendo válido aunque no se pueda persistir
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            print(f"No se pudo guardar el snapshot mergeado: {e}")
+
+    @staticmethod
+    def _selfcheck_logits(model, tok) -> torch.Tensor:
+        # Mismo prompt que en producción (SYSTEM_PROMPT / USER_PREFIX del entorno)
+        system_prompt, user_prefix = FinnedTunnedModel._prompt_parts()
+        prompt = tok.apply_chat_template(
+            [{"role": "system", "content": system_prompt},
+            {"role": "user",   "content": user_prefix + SELFCHECK_TEXT}],
+            tokenize=False, add_generation_prompt=True
+        )
+        ids = tok(prompt, return_tensors="pt").input_ids
+        with torch.inference_mode():
+            return model(input_ids=ids).logits[0].float()
+
+    def apply_cpu_inference_mode(self, model, tok, mode: str = CPU_INFERENCE_MODE):
+        """
+        Convert a float32 CPU model to the requested inference mode and run a
+        self-check against the float32 outputs on a fixed prompt.
+
+        Modes:
+            - ``fp32``: no change.
+            - ``bf16``: cast weights to bfloat16 (only if the CPU supports it).
+            - ``int8``: dynamic int8 quantization of the ``nn.Linear`` layers.
+              LoRA adapters are merged first, since quantized layers do not
+              expose the weight tensors PEFT reads.
+
+        The self-check compares the next-token argmax at every prompt position
+        and stores the result in ``self.inference_mode_report``.
+
+        Args:
+            model: Loaded float32 model (``PeftModel`` or merged)
+            tok: Tokenizer
+            mode (str): ``fp32``, ``bf16`` or ``int8``
+
+        Returns:
+            The converted model
+        """
+        if mode not in ("fp32", "bf16", "int8"):
+            raise ValueError(f"CPU_INFERENCE_MODE no soportado: {mode}")
+        self.inference_mode_report = {"mode": "fp32"}
+        if mode == "fp32":
+            return model
+
+        if mode == "bf16":
+            try:
+                bf16_ok = torch.ops.mkldnn._is_mkldnn_bf16_supported()
+            except Exception:
+                bf16_ok = False
+            if not bf16_ok:
+                print("CPU sin soporte bf16 nativo; se mantiene fp32")
+                return model
+
+        reference = self._selfcheck_logits(model, tok)
+        if mode == "bf16":
+            model = model.to(torch.bfloat16)
+        else:
+            if isinstance(model, PeftModel):
+                print("Mergeando adapter LoRA antes de cuantizar")
+                model = model.merge_and_unload()
+            model = torch.ao.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+            )
+
+        converted = self._selfcheck_logits(model, tok)
+        agreement = float((converted.argmax(-1) == reference.argmax(-1)).float().mean())
+        max_abs_diff = float((converted - reference).abs().max())
+        self.inference_mode_report = {
+            "mode": mode,
+            "top1_agreement": agreement,
+            "max_abs_logit_diff": max_abs_diff,
+            "passed": agreement >= SELFCHECK_MIN_AGREEMENT,
+        }
+        print(f"Inference mode self-check: {self.inference_mode_report}")
+        if agreement < SELFCHECK_MIN_AGREEMENT:
+            print(
+                f"WARNING: {mode} coincide con fp32 en {agreement:.2%} de las posiciones "
+                f"(mínimo {SELFCHECK_MIN_AGREEMENT:.0%})"
+            )
+        return model
+
     def build_prompt(self, src: str) -> str:
         """
         Build a prompt for the model using the chat template.
@@ -147,15 +405,107 @@ class FinnedTunnedModel:
         Returns:
             str: Formatted prompt ready for the model
         """
-        if not self.is_initialized():
+        # Solo necesita el tokenizer: el caché del prefijo y el warmup la usan durante la carga
+        if getattr(self, "tokenizer", None) is None:
             raise RuntimeError("Model not initialized. Call FinnedTunnedModel() first.")
-            
+
+        system_prompt, user_prefix = self._prompt_parts()
         return self.tokenizer.apply_chat_template(
-            [{"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user",   "content": USER_PREFIX + str(src)}],
+            [{"role": "system", "content": system_prompt},
+            {"role": "user",   "content": user_prefix + str(src)}],
             tokenize=False, add_generation_prompt=True
         )
 
+    @staticmethod
+    def _prompt_parts() -> Tuple[str, str]:
+        # Se leen en cada llamada para que un cambio en las variables de entorno
+        # invalide el caché del prefijo
+        return os.getenv("SYSTEM_PROMPT", SYSTEM_PROMPT), os.getenv("USER_PREFIX", USER_PREFIX)
+
+    def _get_prefix_cache(self) -> Optional[dict]:
+        """
+        Return the prefilled KV cache for the shared prompt prefix, computing it
+        on first use or when SYSTEM_PROMPT/USER_PREFIX change.
+
+        The prefix is everything the chat template renders before the source
+        text: system turn, user header and USER_PREFIX.
+
+        Returns:
+            Optional[dict]: ``{"key", "text", "input_ids", "cache"}`` or None
+            if the model does not support cache reuse
+        """
+        key = self._prompt_parts()
+        cached = self._prefix_cache
+        if cached is not None and cached["key"] == key:
+            return cached
+
+        with self._prefix_lock:
+            cached = self._prefix_cache
+            if cached is not None and cached["key"] == key:
+                return cached
+            try:
+                marker = "<<<SRC>>>"
+                prefix_text = self.build_prompt(marker).split(marker, 1)[0]
+                prefix_ids = self.tokenizer(prefix_text, return_tensors="pt").input_ids.to(DEVICE)
+                with torch.inference_mode():
+                    cache = self.model(
+                        input_ids=prefix_ids, past_key_values=DynamicCache(), use_cache=True
+                    ).past_key_values
+                self._prefix_cache = {"key": key, "text": prefix_text, "input_ids": prefix_ids, "cache": cache}
+                print(f"Prefix KV cache built ({prefix_ids.shape[1]} tokens)")
+            except Exception as e:
+                print(f"Prefix KV cache disabled: {e}")
+                self._prefix_cache = None
+            return self._prefix_cache
+
+    def _encode_single(self, text: str) -> Tuple[dict, dict]:
+        """
+        Tokenize a single prompt, reusing the prefix KV cache when possible.
+
+        The full prompt is tokenized as in the uncached path; the cache is only
+        passed to ``generate`` when those ids start with the cached prefix ids,
+        so a tokenizer merge across the prefix boundary falls back to a full prefill.
+
+        Returns:
+            Tuple[dict, dict]: model inputs and extra ``generate`` kwargs
+        """
+        prompt = self.build_prompt(text)
+        inputs = dict(self.tokenizer(prompt, return_tensors="pt", truncation=True).to(DEVICE))
+        prefix = self._get_prefix_cache() if PREFIX_CACHE else None
+        if prefix is None:
+            return inputs, {}
+
+        input_ids, prefix_ids = inputs["input_ids"], prefix["input_ids"]
+        n_prefix = prefix_ids.shape[1]
+        if input_ids.shape[1] <= n_prefix or not torch.equal(input_ids[:, :n_prefix], prefix_ids):
+            return inputs, {}
+        # generate extiende el caché en sitio: cada llamada usa su propia copia
+        return inputs, {"past_key_values": copy.deepcopy(prefix["cache"])}
+
+    @staticmethod
+    def cache_key(text: str, seed: Optional[int] = None, deterministic: bool = False) -> str:
+        """
+        Generation cache key for ``text`` under the current model, prompts and
+        GEN_CFG. Does not require the model to be loaded.
+        """
+        system_prompt, user_prefix = FinnedTunnedModel._prompt_parts()
+        return make_cache_key(
+            model=MODEL_NAME, system_prompt=system_prompt, user_prefix=user_prefix, text=text,
+            gen_cfg=GEN_CFG, seed=seed, deterministic=deterministic,
+        )
+
+    def _generation_config(self, deterministic: bool = False) -> dict:
+        cfg = GEN_CFG.copy()
+        if deterministic:
+            # Decodificación greedy: misma entrada -> misma salida
+            cfg["do_sample"] = False
+            cfg.pop("temperature", None)
+            cfg.pop("top_p", None)
+        if self.EOS_ID is not None:
+            cfg["eos_token_id"] = self.EOS_ID
+        cfg["pad_token_id"] = self.tokenizer.pad_token_id
+        return cfg
+
     def generate(self, text: str) -> str:
         """
         Generate a summary for the given text.
@@ -171,24 +521,73 @@ class FinnedTunnedModel:
         """
         if not self.is_initialized():
             raise RuntimeError("Model not initialized. Call FinnedTunnedModel() first.")
-            
+
         print('Generating summary for text of length:', len(text))
-        cfg = GEN_CFG.copy()
-        if self.EOS_ID is not None:
-            cfg["eos_token_id"] = self.EOS_ID
-        cfg["pad_token_id"] = self.tokenizer.pad_token_id
+        return self.generate_batch([text])[0]
 
-        print('Generating prompt...')
+    def generate_batch(
+        self,
+        texts: List[str],
+        batch_size: int = GEN_BATCH_SIZE,
+        seed: Optional[int] = None,
+        deterministic: bool = False,
+    ) -> List[str]:
+        """
+        Generate summaries for several texts, decoding up to ``batch_size``
+        prompts per ``model.generate`` call.
 
-        prompt = self.build_prompt(text)
-        print('Prompt generated. Length:', len(prompt))
-        print('Prompt generated :', prompt)
-        inputs = self.tokenizer(prompt, return_tensors="pt", padding=True, truncation=True).to(DEVICE)
-        gen = self.model.generate(**inputs, **cfg)
-        print('Generation completed.')
+        The tokenizer pads on the left, so every prompt in a batch ends at the
+        same position and the generated tokens start right after the padded
+        prompt length.
+
+        With a ``seed`` each text is sampled on its own with the RNG reset to
+        that seed, so the output doesn't depend on which texts share a batch.
+        
+        Args:
+            texts (List[str]): Input texts to summarize
+            batch_size (int): Maximum number of prompts per forward batch
+            seed (Optional[int]): Sampling seed
+            deterministic (bool): Use greedy decoding instead of sampling
+            
+        Returns:
+            List[str]: Generated summaries, in the same order as ``texts``
+            
+        Raises:
+            RuntimeError: If the model is not initialized
+        """
+        if not self.is_initialized():
+            raise RuntimeError("Model not initialized. Call FinnedTunnedModel() first.")
+        if batch_size < 1:
+            raise ValueError("batch_size debe ser >= 1")
+
+        cfg = self._generation_config(deterministic)
+        if seed is not None:
+            summaries: List[str] = []
+            for text in texts:
+                with torch.random.fork_rng(devices=[]):
+                    torch.manual_seed(seed)
+                    summaries.extend(self._generate_chunk([text], cfg))
+            return summaries
+
+        summaries = []
+        for start in range(0, len(texts), batch_size):
+            summaries.extend(self._generate_chunk(texts[start:start + batch_size], cfg))
+        return summaries
+
+    def _generate_chunk(self, chunk: List[str], cfg: dict) -> List[str]:
+        print(f'Generating batch of {len(chunk)} prompt(s)...')
+        if len(chunk) == 1:
+            # Con un solo prompt no hay padding y se puede reutilizar el prefijo
+            inputs, extra = self._encode_single(chunk[0])
+        else:
+            prompts = [self.build_prompt(t) for t in chunk]
+            inputs = self.tokenizer(prompts, return_tensors="pt", padding=True, truncation=True).to(DEVICE)
+            extra = {}
+        with torch.inference_mode():
+            gen = self.model.generate(**inputs, **cfg, **extra)
         cut = inputs["input_ids"].shape[1]
-        summary = self.tokenizer.decode(gen[0, cut:], skip_special_tokens=True).strip()
-        return summary
+        print('Generation completed.')
+        return [s.strip() for s in self.tokenizer.batch_decode(gen[:, cut:], skip_special_tokens=True)]
 
         """
         Cleanup method to ensure proper resource disposal.
@@ -197,4 +596,82 @@ class FinnedTunnedModel:
             # Move model to CPU to free GPU memory
             self.model.cpu()
             del self.model
-            print("FinnedTunnedModel resources cleaned up")
\ No newline at end of file
+            print("FinnedTunnedModel resources cleaned up")
+
+    def generate_stream(
+        self, text: str, submit: Optional[Callable[[Callable[[], None]], Future]] = None
+    ) -> Iterator[str]:
+        """
+        Generate a summary for the given text, yielding text fragments as
+        tokens are decoded.
+
+        ``model.generate`` runs on another thread and pushes decoded text
+        into a ``TextIteratorStreamer``; iterating this generator blocks until
+        the next fragment is available.
+        
+        Args:
+            text (str): Input text to summarize
+            submit (callable, optional): Schedules the blocking generation
+                (e.g. on the batcher's generation thread) and returns its
+                future; by default it runs on a new background thread
+            
+        Yields:
+            str: Newly decoded text fragments, in order
+            
+        Raises:
+            RuntimeError: If the model is not initialized
+        """
+        if not self.is_initialized():
+            raise RuntimeError("Model not initialized. Call FinnedTunnedModel() first.")
+
+        cfg = self._generation_config()
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        stop = threading.Event()
+        errors: List[BaseException] = []
+
+        def _run():
+            try:
+                if stop.is_set():  # el consumidor se fue antes de que llegara su turno
+                    streamer.end()
+                    return
+                # También el prefijo (que puede ejecutar el modelo) se arma en el hilo de generación
+                inputs, extra = self._encode_single(text)
+                with torch.inference_mode():
+                    self.model.generate(
+                        **inputs, **cfg, **extra,
+                        streamer=streamer,
+                        stopping_criteria=StoppingCriteriaList([_StopOnEvent(stop)]),
+                    )
+            except BaseException as e:
+                errors.append(e)
+                # Desbloquea al consumidor si generate falla antes de terminar
+                streamer.end()
+
+        if submit is None:
+            future: Future = Future()
+
+            def _thread():
+                _run()
+                future.set_result(None)
+
+            threading.Thread(target=_thread, name="generation-stream", daemon=True).start()
+        else:
+            future = submit(_run)
+
+            def _not_run(f: Future) -> None:
+                # El executor no llegó a ejecutar _run (scheduler detenido): desbloquea al consumidor
+                if f.cancelled() or f.exception() is not None:
+                    errors.append(RuntimeError("Generation cancelled") if f.cancelled() else f.exception())
+                    streamer.end()
+
+            future.add_done_callback(_not_run)
+        try:
+            for fragment in streamer:
+                if fragment:
+                    yield fragment
+        finally:
+            # Si el consumidor abandona el stream, se corta la decodificación
+            stop.set()
+            wait([future])
+        if errors:
+            raise errors[0]
@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+
+# Caché persistente de generaciones (solo para solicitudes con seed o deterministas)
+GEN_CACHE = os.getenv("GEN_CACHE", "1") == "1"
+GEN_CACHE_PATH = os.getenv(
+    "GEN_CACHE_PATH", os.path.join(os.getenv("MODEL_PATH", "/models"), "generation_cache.sqlite3")
+)
+GEN_CACHE_MAX_MB = float(os.getenv("GEN_CACHE_MAX_MB", "256"))
+
+
+def make_cache_key(
+    model: str,
+    system_prompt: Optional[str],
+    user_prefix: Optional[str],
+    text: str,
+    gen_cfg: dict,
+    seed: Optional[int] = None,
+    deterministic: bool = False,
+) -> str:
+    """Content-addressed key: sha256 over everything that determines the output."""
+    payload = json.dumps(
+        {
+            "model": model,
+            "system_prompt": system_prompt,
+            "user_prefix": user_prefix,
+            "text": text,
+            "gen_cfg": gen_cfg,
+            "seed": seed,
+            "deterministic": deterministic,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    SQLite-backed key/value store for generated summaries with LRU eviction.
+
+    Every read refreshes the entry's access time; when the stored bytes go
+    over ``max_bytes`` the least recently used entries are deleted.
+    """
+
+    def __init__(self, path: str = GEN_CACHE_PATH, max_bytes: int = int(GEN_CACHE_MAX_MB * 1024 * 1024), enabled: bool = GEN_CACHE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+        if enabled:
+            try:
+                self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS generations ("
+                    " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                    " size INTEGER NOT NULL, last_access REAL NOT NULL)"
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON generations(last_access)")
+            except Exception as e:
+                print(f"Generation cache disabled: {e}")
+                self._conn = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None
+
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        """Return the cached values found for ``keys`` and refresh their access time."""
+        if not self.enabled or not keys:
+            return {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            found = {}
+            for start in range(0, len(unique), 500):
+                part = unique[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM generations WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE generations SET last_access = ? WHERE key = ?", [(now, k) for k in found]
+                )
+            self.hits += sum(1 for k in keys if k in found)
+            self.misses += sum(1 for k in keys if k not in found)
+            return found
+
+    def put_many(self, items: Dict[str, str]) -> None:
+        """Store ``key -> value`` pairs and evict LRU entries over the size limit."""
+        if not self.enabled or not items:
+            return
+        now = time.time()
+        rows = [(k, v, len(v.encode("utf-8")), now) for k, v in items.items()]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO generations (key, value, size, last_access) VALUES (?, ?, ?, ?)", rows
+            )
+            self._evict()
+            self._conn.execute("COMMIT")
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM generations").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM generations ORDER BY last_access ASC"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM generations WHERE key = ?", victims)
+
+    def stats(self) -> dict:
+        """Hit ratio, entry count and bytes stored."""
+        entries, stored = 0, 0
+        if self.enabled:
+            with self._lock:
+                entries, stored = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM generations"
+                ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes_stored": stored,
+            "max_bytes": self.max_bytes,
+        }
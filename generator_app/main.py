@@ -1,6 +1,10 @@
 from typing import Any
+import asyncio
+import json
+import os
 
-from fastapi import APIRouter, FastAPI, Request
+from fastapi import APIRouter, FastAPI, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 from loguru import logger
@@ -8,8 +12,10 @@ from loguru import logger
 
 import sys
 from pathlib import Path
-from generator_app.api import api_router
+from generator_app.api import api_router, generation_batcher
 from generator_app.config import settings, setup_app_logging
+from generator_app.helpers.external_model_source import aclose_clients
+from generator_app.helpers.finned_tunned_model import FinnedTunnedModel, MODEL_NAME
 
 # setup logging as early as possible
 setup_app_logging(config=settings)
@@ -39,12 +45,53 @@ def index(request: Request) -> Any:
 app.include_router(api_router, prefix=settings.API_V1_STR)
 app.include_router(root_router)
 
+# Carga el modelo fine-tuned al arrancar en lugar de en la primera solicitud
+EAGER_LOAD = os.getenv("EAGER_LOAD", "1") == "1"
+_readiness = {"ready": not EAGER_LOAD, "error": None}
+
+async def _load_model():
+    try:
+        # El constructor carga pesos, arma el caché del prefijo y hace la generación de warmup
+        await run_in_threadpool(FinnedTunnedModel)
+        _readiness["ready"] = True
+        logger.info("Fine-tuned model loaded and warmed up")
+    except Exception as e:
+        _readiness["error"] = str(e)
+        logger.error(f"Model load failed: {e}")
+
+@app.on_event("startup")
+async def _startup():
+    if EAGER_LOAD:
+        # En segundo plano: /healthz responde mientras el modelo carga
+        asyncio.get_running_loop().create_task(_load_model())
+
+@app.on_event("shutdown")
+async def _shutdown():
+    await generation_batcher.stop()
+    await aclose_clients()
+
 # Health check endpoint para ECS (en la raíz, sin prefijo)
 @app.get("/healthz")
 async def healthz():
     """Health check endpoint para ECS"""
     return {"status": "healthy"}
 
+# Readiness para el load balancer: 503 hasta que el modelo esté cargado y calentado
+@app.get("/readyz")
+async def readyz():
+    """Readiness check: 503 mientras el modelo fine-tuned no esté listo"""
+    model = FinnedTunnedModel._instance
+    status = {
+        "ready": _readiness["ready"],
+        "model": MODEL_NAME,
+        "error": _readiness["error"],
+        "load_timings": getattr(model, "load_timings", None),
+        "inference_mode": getattr(model, "inference_mode_report", None),
+    }
+    if not status["ready"]:
+        return Response(content=json.dumps(status), media_type="application/json", status_code=503)
+    return status
+
 # Set all CORS enabled origins
 if settings.BACKEND_CORS_ORIGINS:
     app.add_middleware(
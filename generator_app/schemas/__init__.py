@@ -1,2 +1,4 @@
 from .health import Health
 from .predict import MultipleDataInputs, GenerationResults, GenerationRequest
+from .scheduler import SchedulerStats
+from .cache import CacheStats
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+
+class CacheStats(BaseModel):
+    enabled: bool
+    hits: int
+    misses: int
+    hit_ratio: float
+    entries: int
+    bytes_stored: int
+    max_bytes: int
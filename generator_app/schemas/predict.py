@@ -16,9 +16,13 @@ class GenerationResults(BaseModel):
 class MultipleDataInputs(BaseModel):
     inputs: List[str]
     model: str
+    # Con deterministic=True (o seed, solo en el modelo fine-tuned) las generaciones se guardan/leen del caché;
+    # entre los externos, solo Claude respeta deterministic (temperatura 0) y se cachea
+    seed: Optional[int] = None
+    deterministic: bool = False
     class Config:
         schema_extra = {"example": {"inputs": ["Sample text for prediction"], "model": "your_model_name"}}
 
 class GenerationRequest(BaseModel):
     prompt: str
-    model: str
\ No newline at end of file
+    model: str
\ No newline at end of file
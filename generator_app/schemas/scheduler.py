@@ -0,0 +1,17 @@
+from typing import Dict
+
+from pydantic import BaseModel
+
+
+class SchedulerStats(BaseModel):
+    queue_depth: int
+    in_flight: int
+    max_batch_size: int
+    max_wait_ms: float
+    batches_total: int
+    requests_total: int
+    errors_total: int
+    avg_batch_size: float
+    avg_queue_wait_ms: float
+    avg_batch_ms: float
+    batch_size_histogram: Dict[str, int]
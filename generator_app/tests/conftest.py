@@ -0,0 +1,97 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Generator
+
+import pytest
+
+
+class FakeProviderState:
+    """Shared state of the fake server: request counters and concurrency peak."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.rate_limited = set()
+        self.delay_s = 0.05
+
+
+def _make_handler(state: FakeProviderState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status: int, body: dict, headers: dict = None):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if self.path.endswith("/messages"):
+                text = payload["messages"][0]["content"]
+            else:
+                text = payload["input"]
+
+            with state.lock:
+                state.requests += 1
+                state.in_flight += 1
+                state.max_in_flight = max(state.max_in_flight, state.in_flight)
+                # Primer intento de un texto marcado con RATE_LIMIT -> 429
+                limited = "RATE_LIMIT" in text and text not in state.rate_limited
+                if limited:
+                    state.rate_limited.add(text)
+            try:
+                time.sleep(state.delay_s)
+                if limited:
+                    self._reply(429, {"error": {"type": "rate_limit_error", "message": "slow down"}},
+                                {"retry-after-ms": "10"})
+                    return
+                answer = f"summary:{text}"
+                if self.path.endswith("/messages"):
+                    self._reply(200, {
+                        "id": "msg_fake", "type": "message", "role": "assistant", "model": payload["model"],
+                        "content": [{"type": "text", "text": answer}],
+                        "stop_reason": "end_turn", "stop_sequence": None,
+                        "usage": {"input_tokens": 1, "output_tokens": 1},
+                    })
+                else:
+                    self._reply(200, {
+                        "id": "resp_fake", "object": "response", "created_at": 0, "model": payload["model"],
+                        "status": "completed", "parallel_tool_calls": False, "tool_choice": "auto", "tools": [],
+                        "output": [{
+                            "type": "message", "id": "msg_fake", "status": "completed", "role": "assistant",
+                            "content": [{"type": "output_text", "text": answer, "annotations": []}],
+                        }],
+                    })
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+    return Handler
+
+
+# Servidor local que simula las APIs de Anthropic y OpenAI
+@pytest.fixture()
+def fake_provider(monkeypatch) -> Generator:
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("SYSTEM_PROMPT", "")
+    monkeypatch.setenv("USER_PREFIX", "")
+
+    state = FakeProviderState()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(state))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield state
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import time
+
+from generator_app.helpers.batch_scheduler import GenerationBatcher
+
+
+def test_run_exclusive_never_overlaps_a_batch() -> None:
+    # Given
+    lock = threading.Lock()
+    overlaps = []
+
+    def generate(batch):
+        if not lock.acquire(blocking=False):
+            overlaps.append(batch)
+            return batch
+        try:
+            time.sleep(0.02)
+            return [f"out:{t}" for t in batch]
+        finally:
+            lock.release()
+
+    def seeded():
+        if not lock.acquire(blocking=False):
+            overlaps.append("seeded")
+            return None
+        try:
+            time.sleep(0.02)
+            return threading.current_thread().name
+        finally:
+            lock.release()
+
+    async def scenario():
+        batcher = GenerationBatcher(generate, max_batch_size=2, max_wait_ms=1)
+        try:
+            return await asyncio.gather(
+                *(batcher.submit(f"t{i}") for i in range(6)),
+                *(batcher.run_exclusive(seeded) for _ in range(3)),
+            )
+        finally:
+            await batcher.stop()
+
+    # When
+    results = asyncio.run(scenario())
+
+    # Then
+    assert results[:6] == [f"out:t{i}" for i in range(6)]
+    assert all(name.startswith("generation") for name in results[6:])
+    assert not overlaps
+
+
+def test_stream_generation_runs_on_the_generation_thread(monkeypatch) -> None:
+    # Given
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from generator_app import api
+
+    threads = []
+
+    class FakeModel:
+        def generate_stream(self, text, submit):
+            submit(lambda: threads.append(threading.current_thread().name)).result()
+            yield from text.split()
+
+    monkeypatch.setattr(api, "FinnedTunnedModel", FakeModel)
+    monkeypatch.setattr(api, "generation_batcher", GenerationBatcher(lambda batch: batch))
+    app = FastAPI()
+    app.include_router(api.api_router)
+
+    # When
+    with TestClient(app) as client:
+        body = client.post("/generate/stream", json={"prompt": "a b", "model": "ollama_finned_tunned"}).text
+
+    # Then
+    assert threads and threads[0].startswith("generation")
+    assert '"generation": "ab"' in body
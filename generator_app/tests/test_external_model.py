@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+from generator_app.helpers.external_model_source import ExternalModel, _async_clients, _get_client, aclose_clients
+from generator_app.schemas.supported_models import SupportedModels
+
+
+def test_anthropic_fan_out_keeps_order_and_limit(fake_provider) -> None:
+    # Given
+    model = ExternalModel(SupportedModels.CLAUDE_SONNET_4.value, base_url=fake_provider.base_url)
+    prompts = [f"text {i}" for i in range(12)]
+
+    # When
+    started = time.perf_counter()
+    results = asyncio.run(model.agenerate_many(prompts, concurrency=4))
+    elapsed = time.perf_counter() - started
+
+    # Then
+    assert results == [f"summary:{p}" for p in prompts]
+    assert fake_provider.max_in_flight <= 4
+    # 12 llamadas de 50 ms con 4 en paralelo: bastante menos que la suma secuencial
+    assert elapsed < 12 * fake_provider.delay_s
+
+
+def test_openai_retries_on_429(fake_provider) -> None:
+    # Given
+    model = ExternalModel(SupportedModels.CHATGPT_4.value, base_url=f"{fake_provider.base_url}/v1")
+
+    # When
+    results = asyncio.run(model.agenerate_many(["RATE_LIMIT one", "two"]))
+
+    # Then
+    assert results == ["summary:RATE_LIMIT one", "summary:two"]
+    assert fake_provider.requests == 3
+
+
+def test_sync_generate_uses_same_provider(fake_provider) -> None:
+    model = ExternalModel(SupportedModels.CLAUDE_SONNET_4.value, base_url=fake_provider.base_url)
+
+    assert model.generate("hello") == "summary:hello"
+
+
+def test_async_clients_are_per_loop_and_closed_on_shutdown(fake_provider) -> None:
+    # Given
+    model = ExternalModel(SupportedModels.CLAUDE_SONNET_4.value, base_url=fake_provider.base_url)
+
+    async def _serve():
+        await model.agenerate("hello")
+        client = _get_client("anthropic", model.anthropicKey, model.base_url, asynchronous=True)
+        # When: el shutdown de la app cierra los clientes de su loop
+        await aclose_clients()
+        assert asyncio.get_running_loop() not in _async_clients
+        return client
+
+    first = asyncio.run(_serve())
+    second = asyncio.run(_serve())
+
+    # Then
+    assert first is not second
+    assert first.is_closed() and second.is_closed()
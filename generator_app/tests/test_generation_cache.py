@@ -0,0 +1,78 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from generator_app import api
+from generator_app.helpers.generation_cache import GenerationCache, make_cache_key
+from generator_app.schemas.supported_models import SupportedModels
+
+
+def test_cache_evicts_least_recently_used(tmp_path) -> None:
+    # Given: espacio para dos valores de 10 bytes
+    cache = GenerationCache(str(tmp_path / "cache.sqlite3"), max_bytes=20, enabled=True)
+    cache.put_many({"a": "x" * 10, "b": "y" * 10})
+    cache.get_many(["a"])  # "a" pasa a ser el más reciente
+
+    # When
+    cache.put_many({"c": "z" * 10})
+
+    # Then
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes_stored"] == 20
+    assert stats["hits"] == 3 and stats["misses"] == 1
+
+
+def test_cache_key_depends_on_generation_inputs() -> None:
+    base = dict(model="m", system_prompt="s", user_prefix="u", text="t", gen_cfg={"top_p": 0.9})
+
+    assert make_cache_key(**base) == make_cache_key(**base)
+    assert make_cache_key(**base) != make_cache_key(**{**base, "text": "other"})
+    assert make_cache_key(**base) != make_cache_key(**{**base, "gen_cfg": {"top_p": 0.5}})
+    assert make_cache_key(**base, seed=1) != make_cache_key(**base, seed=2)
+
+
+def test_generate_reuses_cached_results(fake_provider, tmp_path, monkeypatch) -> None:
+    # Given
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", fake_provider.base_url)
+    monkeypatch.setattr(api, "generation_cache", GenerationCache(str(tmp_path / "cache.sqlite3"), enabled=True))
+    app = FastAPI()
+    app.include_router(api.api_router)
+    client = TestClient(app)
+    payload = {"inputs": ["one", "two"], "model": SupportedModels.CLAUDE_SONNET_4.value, "deterministic": True}
+
+    # When
+    first = client.post("/generate", json=payload).json()
+    second = client.post("/generate", json={**payload, "inputs": ["two", "three"]}).json()
+    sampled = client.post("/generate", json={**payload, "deterministic": False}).json()
+    seeded = [client.post("/generate", json={**payload, "deterministic": False, "seed": 7}).json() for _ in range(2)]
+
+    # Then
+    assert first["generation"] == ["summary:one", "summary:two"]
+    assert second["generation"] == ["summary:two", "summary:three"]
+    assert second["metadata"]["cache_hits"] == 1
+    # Sin seed ni modo determinista no se usa el caché
+    assert sampled["metadata"]["cache_hits"] == 0
+    # Los proveedores externos no reciben el seed: una muestra con seed no es reproducible
+    assert [r["metadata"]["cache_hits"] for r in seeded] == [0, 0]
+    assert fake_provider.requests == 9
+    assert client.get("/cache/stats").json()["entries"] == 3
+
+
+def test_openai_outputs_are_not_cached(fake_provider, tmp_path, monkeypatch) -> None:
+    # Given
+    monkeypatch.setenv("OPENAI_BASE_URL", f"{fake_provider.base_url}/v1")
+    monkeypatch.setattr(api, "generation_cache", GenerationCache(str(tmp_path / "cache.sqlite3"), enabled=True))
+    app = FastAPI()
+    app.include_router(api.api_router)
+    client = TestClient(app)
+    payload = {"inputs": ["one"], "model": SupportedModels.CHATGPT_4.value, "deterministic": True}
+
+    # When
+    results = [client.post("/generate", json=payload).json() for _ in range(2)]
+
+    # Then
+    # el request de OpenAI no fija la temperatura: deterministic no garantiza la misma salida
+    assert [r["metadata"]["cache_hits"] for r in results] == [0, 0]
+    assert fake_provider.requests == 2
+    assert client.get("/cache/stats").json()["entries"] == 0
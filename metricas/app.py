@@ -1,21 +1,32 @@
 # app.py
 import os
 import json
+import time
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pandas as pd
+from typing import Callable, Dict, List, Optional
 from tqdm.auto import tqdm
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from schemas.schemas import RelevanceRequest, FactualityRequest, ReadabilityRequest, LossRequest
+from schemas.schemas import RelevanceRequest, FactualityRequest, ReadabilityRequest, LossRequest, AllMetricsRequest, CalibrationRequest
 from utils.relevance import (
     compute_relevance,
     BERTSCORE_MODEL,
     DEVICE as BERT_DEVICE,
     warmup_relevance,
+    relevance_cache_stats,
     is_warmed_up as rel_ready,
 )
 from utils.factuality import (
     compute_factuality,
+    compute_factuality_detailed,
+    error_stats as fac_error_stats,
+    context_cache_stats as fac_cache_stats,
     warmup_factuality,
     DEVICE as ALIGN_DEVICE,
     ALIGNSCORE_MODEL,
@@ -26,6 +37,9 @@ from utils.readability import (
     warmup_readability,
     is_warmed_up as rea_ready,
 )
+from utils.executors import run_metric, run_metric_sync, shutdown_executors, thread_budget
+from utils.running_stats import RunningStats
+from utils.worker_pool import METRICS_WORKERS, start_worker_pool, shutdown_worker_pool, pool_stats
 
 app = FastAPI(title="Text Metrics API", version="0.1.0")
 origins = ["*"]
@@ -53,12 +67,41 @@ SIGMA_FKGL = 2.0793
 SIGMA_SMOG = 1.6875
 SIGMA_DALECHALL = 0.7911
 
+# estadísticos combinables (count/mean/M2 + sketch) de la última calibración, por métrica
+CALIBRATION_STATS: Dict[str, RunningStats] = {}
+
+# métrica -> sufijo de TARGET_*/SIGMA_*
+_TARGET_KEYS = {
+    "relevance": "RELEVANCE", "factuality": "FACTUALITY",
+    "fkgl": "FKGL", "smog": "SMOG", "dale_chall": "DALECHALL",
+}
+
+def _targets_from_stats(stats: Dict[str, RunningStats]) -> dict:
+    """TARGET_* (media) y SIGMA_* (desviación estándar muestral) a partir de los estadísticos."""
+    vals = {}
+    for metric, suffix in _TARGET_KEYS.items():
+        if metric in stats and stats[metric].count > 0:
+            vals[f"TARGET_{suffix}"] = stats[metric].mean
+            vals[f"SIGMA_{suffix}"] = stats[metric].std
+    return vals
+
+def _stats_from_json(data: dict) -> Dict[str, RunningStats]:
+    return {k: RunningStats.from_dict(v) for k, v in (data.get("stats") or {}).items() if k in _TARGET_KEYS}
+
 def load_targets(path: str) -> bool:
-    """Carga TARGET_* y SIGMA_* desde un JSON si existe. Devuelve True si cargó."""
+    """
+    Carga TARGET_* y SIGMA_* desde un JSON si existe. Devuelve True si cargó.
+    Si el JSON trae "stats" (count/mean/m2 por métrica), se guardan en CALIBRATION_STATS
+    y completan los TARGET_*/SIGMA_* que no estén explícitos.
+    """
     if not os.path.isfile(path):
         return False
     with open(path, "r", encoding="utf-8") as f:
         data = json.load(f)
+    stats = _stats_from_json(data)
+    data = {**_targets_from_stats(stats), **data}
+    CALIBRATION_STATS.clear()
+    CALIBRATION_STATS.update(stats)
     globals().update({
         # medias
         "TARGET_RELEVANCE":  float(data.get("TARGET_RELEVANCE",  TARGET_RELEVANCE)),
@@ -75,13 +118,8 @@ def load_targets(path: str) -> bool:
     })
     return True
 
-def calibrateTargets(path: str, update_globals: bool = True, save_to: str | None = None, *, subset: float = 1.0, seed: int = 42, chunk_size: int = 16, progress: bool = True):
-    """
-    Lee un CSV con columnas: 'source_text', 'target_text' y 'split'.
-    Usa EXCLUSIVAMENTE el split 'train' para evitar data leak.
-    Toma un subconjunto (subset ∈ (0,1]) y calcula promedios y desviaciones estándar.
-    Opcionalmente actualiza TARGET_* en memoria y guarda a JSON.
-    """
+def _calibration_texts(path: str, subset: float, seed: int):
+    """Pares (original, humano) del split 'train' de ``path``, limpios y submuestreados."""
     if not (0.0 < subset <= 1.0):
         raise ValueError("subset debe estar en (0, 1].")
 
@@ -108,78 +146,257 @@ def calibrateTargets(path: str, update_globals: bool = True, save_to: str | None
     if subset < 1.0:
         df = df.sample(frac=subset, random_state=seed).reset_index(drop=True)
 
-    originals = df["source_text"].tolist()
-    humans    = df["target_text"].tolist()
-    n = len(df)
+    return df["source_text"].tolist(), df["target_text"].tolist()
+
+def _score_calibration_chunk(originals: List[str], humans: List[str]) -> Dict[str, np.ndarray]:
+    # las tres familias en paralelo, en los mismos executors que usan los endpoints
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        rel = pool.submit(run_metric_sync, "relevance", compute_relevance, originals, humans)
+        fac = pool.submit(run_metric_sync, "factuality", compute_factuality, originals, humans)
+        rd  = pool.submit(run_metric_sync, "readability", compute_readability, humans)
+        rd = rd.result()
+        return {
+            "relevance":  np.asarray(rel.result(), dtype=float),
+            "factuality": np.asarray(fac.result(), dtype=float),
+            "fkgl":       np.asarray(rd["fkgl"], dtype=float),
+            "smog":       np.asarray(rd["smog"], dtype=float),
+            "dale_chall": np.asarray(rd["dale_chall"], dtype=float),
+        }
 
-    def _tqdm(total, desc):
-        return tqdm(total=total, desc=desc, unit="txt", disable=not progress)
+def _save_npz_atomic(path: str, arrays: Dict[str, np.ndarray]) -> None:
+    tmp = f"{path}.tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
 
-    # --- Relevance ---
-    rel_all = []
-    with _tqdm(n, "relevance") as bar:
-        for i in range(0, n, chunk_size):
-            j = min(i + chunk_size, n)
-            rel_all.extend(compute_relevance(originals[i:j], humans[i:j]))
-            bar.update(j - i)
+def _save_json_atomic(path: str, data: dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
 
-    # --- Factuality ---
-    fac_all = []
-    with _tqdm(n, "factuality") as bar:
-        for i in range(0, n, chunk_size):
-            j = min(i + chunk_size, n)
-            fac_all.extend(compute_factuality(originals[i:j], humans[i:j]))
-            bar.update(j - i)
-
-    # --- Readability ---
-    fkgl_all, smog_all, dale_all = [], [], []
-    with _tqdm(n, "readability") as bar:
+def calibrateTargets(path: str, update_globals: bool = True, save_to: str | None = None, *, subset: float = 1.0, seed: int = 42, chunk_size: int = 16, progress: bool = True,
+                     checkpoint_dir: str | None = None, on_progress: Optional[Callable[[int, int], None]] = None,
+                     merge_with: str | None = None, sketch_size: int = 100):
+    """
+    Lee un CSV con columnas: 'source_text', 'target_text' y 'split'.
+    Usa EXCLUSIVAMENTE el split 'train' para evitar data leak.
+    Toma un subconjunto (subset ∈ (0,1]) y calcula promedios y desviaciones estándar.
+    Opcionalmente actualiza TARGET_* en memoria y guarda a JSON.
+    Con checkpoint_dir, las métricas de cada chunk se guardan en disco y una corrida
+    interrumpida retoma desde el último chunk completo.
+    Las medias y sigmas salen de estadísticos combinables (count/mean/M2 y un sketch de
+    cuantiles) que se guardan en "stats"; con merge_with (un targets.json previo) solo se
+    calculan las métricas de las filas de path y se combinan con las ya calibradas.
+    """
+    originals, humans = _calibration_texts(path, subset, seed)
+    n = len(originals)
+
+    if checkpoint_dir:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    stats = {k: RunningStats(sketch_size=sketch_size) for k in _TARGET_KEYS}
+    if merge_with:
+        with open(merge_with, "r", encoding="utf-8") as f:
+            previous = _stats_from_json(json.load(f))
+        if set(previous) != set(_TARGET_KEYS):
+            raise ValueError(f"{merge_with} no tiene 'stats' para todas las métricas; no se puede combinar.")
+        for k, s in previous.items():
+            stats[k].merge(s)
+    with tqdm(total=n, desc="calibración", unit="txt", disable=not progress) as bar:
         for i in range(0, n, chunk_size):
             j = min(i + chunk_size, n)
-            rd = compute_readability(humans[i:j])
-            fkgl_all.extend(rd["fkgl"])
-            smog_all.extend(rd["smog"])
-            dale_all.extend(rd["dale_chall"])
+            ckpt = os.path.join(checkpoint_dir, f"chunk_{i:07d}_{j:07d}.npz") if checkpoint_dir else None
+            chunk = None
+            if ckpt and os.path.isfile(ckpt):
+                try:
+                    with np.load(ckpt) as data:
+                        chunk = {k: data[k] for k in stats}
+                except Exception as e:
+                    print(f"[calibration] checkpoint ilegible {ckpt}: {e}")
+            if chunk is None:
+                chunk = _score_calibration_chunk(originals[i:j], humans[i:j])
+                if ckpt:
+                    _save_npz_atomic(ckpt, chunk)
+            for k, s in stats.items():
+                s.update(chunk[k])
             bar.update(j - i)
+            if on_progress:
+                on_progress(j, n)
 
-    # arrays
-    rel_arr  = np.asarray(rel_all, dtype=float)
-    fac_arr  = np.asarray(fac_all, dtype=float)
-    fkgl_arr = np.asarray(fkgl_all, dtype=float)
-    smog_arr = np.asarray(smog_all, dtype=float)
-    dale_arr = np.asarray(dale_all, dtype=float)
+    return _finish_calibration(stats, update_globals, save_to)
 
+def _finish_calibration(stats: Dict[str, RunningStats], update_globals: bool, save_to: str | None) -> dict:
     new_vals = {
-        # medias (targets)
-        "TARGET_RELEVANCE":  float(np.mean(rel_arr)),
-        "TARGET_FACTUALITY": float(np.mean(fac_arr)),
-        "TARGET_FKGL":       float(np.mean(fkgl_arr)),
-        "TARGET_SMOG":       float(np.mean(smog_arr)),
-        "TARGET_DALECHALL":  float(np.mean(dale_arr)),
-        # desviaciones estándar (muestral)
-        "SIGMA_RELEVANCE":   float(np.std(rel_arr,  ddof=1)) if rel_arr.size  > 1 else 0.0,
-        "SIGMA_FACTUALITY":  float(np.std(fac_arr,  ddof=1)) if fac_arr.size  > 1 else 0.0,
-        "SIGMA_FKGL":        float(np.std(fkgl_arr, ddof=1)) if fkgl_arr.size > 1 else 0.0,
-        "SIGMA_SMOG":        float(np.std(smog_arr, ddof=1)) if smog_arr.size > 1 else 0.0,
-        "SIGMA_DALECHALL":   float(np.std(dale_arr, ddof=1)) if dale_arr.size > 1 else 0.0,
-        "n_samples":         int(n),
+        # medias (targets) y desviaciones estándar (muestral)
+        **_targets_from_stats(stats),
+        "n_samples": int(stats["relevance"].count),
+        "stats":     {k: s.to_dict() for k, s in stats.items()},
     }
 
     if update_globals:
-        globals().update({
-            "TARGET_RELEVANCE":  new_vals["TARGET_RELEVANCE"],
-            "TARGET_FACTUALITY": new_vals["TARGET_FACTUALITY"],
-            "TARGET_FKGL":       new_vals["TARGET_FKGL"],
-            "TARGET_SMOG":       new_vals["TARGET_SMOG"],
-            "TARGET_DALECHALL":  new_vals["TARGET_DALECHALL"],
-        })
+        globals().update({k: v for k, v in new_vals.items() if k.startswith("TARGET_")})
+        CALIBRATION_STATS.clear()
+        CALIBRATION_STATS.update(stats)
 
     if save_to:
-        with open(save_to, "w", encoding="utf-8") as f:
-            json.dump({k: v for k, v in new_vals.items() if k != "n_samples"}, f, ensure_ascii=False, indent=2)
+        _save_json_atomic(save_to, {k: v for k, v in new_vals.items() if k != "n_samples"})
 
     return new_vals
 
+def mergeTargetStats(paths: List[str], update_globals: bool = False, save_to: str | None = None):
+    """
+    Combina los "stats" de varios targets.json calculados por separado (p.ej. shards del
+    CSV en distintas máquinas) sin recalcular ninguna métrica. Devuelve lo mismo que
+    calibrateTargets para el conjunto completo.
+    """
+    stats = {k: RunningStats() for k in _TARGET_KEYS}
+    for p in paths:
+        with open(p, "r", encoding="utf-8") as f:
+            shard = _stats_from_json(json.load(f))
+        if set(shard) != set(_TARGET_KEYS):
+            raise ValueError(f"{p} no tiene 'stats' para todas las métricas.")
+        for k, s in shard.items():
+            stats[k].merge(s)
+    return _finish_calibration(stats, update_globals, save_to)
+
+# =========================
+# CALIBRATION JOBS
+# =========================
+CALIBRATION_DIR = os.getenv("CALIBRATION_DIR", "calibration_jobs")
+# Único directorio desde el que la API lee datos (path, merge_with) y escribe resultados (save_to)
+CALIBRATION_DATA_DIR = os.getenv("CALIBRATION_DATA_DIR", "calibration_data")
+
+_calibration_jobs: Dict[str, dict] = {}
+_calibration_lock = threading.Lock()
+_calibration_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="calibration")
+
+def _calibration_save_to(req: CalibrationRequest) -> str:
+    return req.save_to or os.getenv("TARGETS_FILE", "targets.json")
+
+def _confined_path(path: str, *, json_only: bool = False, allow_targets: bool = False) -> str:
+    """
+    Ruta real de ``path`` (las relativas, dentro de CALIBRATION_DATA_DIR). Solo se aceptan
+    archivos dentro de CALIBRATION_DATA_DIR o, con allow_targets, el propio TARGETS_FILE.
+    """
+    targets_file = os.path.realpath(os.getenv("TARGETS_FILE", "targets.json"))
+    if allow_targets and os.path.realpath(path) == targets_file:
+        return targets_file
+    root = os.path.realpath(CALIBRATION_DATA_DIR)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([resolved, root]) != root or resolved == root:
+        raise HTTPException(status_code=400, detail=f"{path} está fuera de CALIBRATION_DATA_DIR.")
+    if json_only and not resolved.endswith(".json"):
+        raise HTTPException(status_code=400, detail=f"{path} debe ser un archivo .json.")
+    return resolved
+
+def _calibration_data_key(req: CalibrationRequest) -> dict:
+    """Lo que determina las métricas calculadas: archivo (tamaño/mtime) y parámetros de muestreo."""
+    st = os.stat(req.path)
+    return {
+        "path": os.path.abspath(req.path), "size": st.st_size, "mtime": st.st_mtime_ns,
+        "subset": req.subset, "seed": req.seed, "chunk_size": req.chunk_size,
+        "merge_with": os.path.abspath(req.merge_with) if req.merge_with else None,
+    }
+
+def _short_hash(data: dict) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def _calibration_job_id(req: CalibrationRequest) -> str:
+    """Mismos datos, parámetros y destino (save_to/apply) -> mismo job."""
+    save_to = _calibration_save_to(req)
+    return _short_hash({
+        **_calibration_data_key(req),
+        "save_to": os.path.abspath(save_to) if save_to else None, "apply": req.apply,
+    })
+
+def _calibration_checkpoint_dir(req: CalibrationRequest) -> str:
+    """Los checkpoints dependen solo de los datos: jobs con otro save_to/apply reutilizan los chunks ya calculados."""
+    return os.path.join(CALIBRATION_DIR, _short_hash(_calibration_data_key(req)))
+
+def _apply_targets(new_vals: dict) -> None:
+    """Reemplaza TARGET_*/SIGMA_* de una sola vez (se invoca en el event loop, entre requests)."""
+    globals().update({k: float(v) for k, v in new_vals.items() if k.startswith(("TARGET_", "SIGMA_"))})
+    if "stats" in new_vals:
+        CALIBRATION_STATS.clear()
+        CALIBRATION_STATS.update({k: RunningStats.from_dict(v) for k, v in new_vals["stats"].items()})
+
+def _run_calibration_job(job: dict, req: CalibrationRequest, loop: asyncio.AbstractEventLoop) -> None:
+    def _progress(done: int, total: int) -> None:
+        job["progress"] = {"done": done, "total": total}
+
+    job.update(status="running", started_at=time.time())
+    try:
+        new_vals = calibrateTargets(
+            req.path, update_globals=False, save_to=None,
+            subset=req.subset, seed=req.seed, chunk_size=req.chunk_size, progress=False,
+            checkpoint_dir=_calibration_checkpoint_dir(req), on_progress=_progress,
+            merge_with=req.merge_with,
+        )
+        save_to = _calibration_save_to(req)
+        if save_to:
+            _save_json_atomic(save_to, {k: v for k, v in new_vals.items() if k != "n_samples"})
+        if req.apply:
+            try:
+                loop.call_soon_threadsafe(_apply_targets, new_vals)
+            except RuntimeError:  # loop cerrado (apagando el servicio)
+                _apply_targets(new_vals)
+        job.update(status="done", result=new_vals, applied=req.apply, saved_to=save_to)
+    except Exception as e:
+        print(f"[calibration] job {job['id']} falló: {type(e).__name__}: {e}")
+        job.update(status="failed", error=f"{type(e).__name__}: {e}")
+    finally:
+        job["finished_at"] = time.time()
+
+def _job_view(job: dict) -> dict:
+    return {k: v for k, v in job.items() if k != "result"}
+
+@app.post("/calibration/jobs", status_code=202)
+async def submit_calibration(req: CalibrationRequest):
+    # Rutas del request confinadas a CALIBRATION_DATA_DIR (y TARGETS_FILE para merge_with/save_to)
+    req = req.copy(update={
+        "path": _confined_path(req.path),
+        "merge_with": _confined_path(req.merge_with, json_only=True, allow_targets=True) if req.merge_with else None,
+        "save_to": _confined_path(_calibration_save_to(req), json_only=True, allow_targets=True),
+    })
+    if not os.path.isfile(req.path):
+        raise HTTPException(status_code=400, detail=f"No existe el archivo {req.path}.")
+    if req.merge_with and not os.path.isfile(req.merge_with):
+        raise HTTPException(status_code=400, detail=f"No existe el archivo {req.merge_with}.")
+    if not (0.0 < req.subset <= 1.0) or req.chunk_size < 1:
+        raise HTTPException(status_code=400, detail="subset debe estar en (0, 1] y chunk_size >= 1.")
+    job_id = _calibration_job_id(req)
+    with _calibration_lock:
+        job = _calibration_jobs.get(job_id)
+        if job is not None and job["status"] in ("queued", "running", "done"):
+            return _job_view(job)
+        # todas las claves existen desde el inicio: el worker solo reasigna valores, así
+        # _job_view puede recorrer el dict desde el event loop mientras el job avanza
+        job = {
+            "id": job_id, "status": "queued", "params": req.dict(),
+            "progress": {"done": 0, "total": None}, "submitted_at": time.time(),
+            "started_at": None, "finished_at": None, "error": None,
+            "result": None, "applied": None, "saved_to": None,
+        }
+        _calibration_jobs[job_id] = job
+    _calibration_executor.submit(_run_calibration_job, job, req, asyncio.get_running_loop())
+    return _job_view(job)
+
+@app.get("/calibration/jobs/{job_id}")
+async def calibration_status(job_id: str):
+    job = _calibration_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job de calibración no encontrado.")
+    return _job_view(job)
+
+@app.get("/calibration/jobs/{job_id}/result")
+async def calibration_result(job_id: str):
+    job = _calibration_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job de calibración no encontrado.")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"El job está en estado '{job['status']}'.")
+    return job["result"]
+
 # =========================
 # STARTUP
 # =========================
@@ -206,22 +423,45 @@ async def _startup():
     except Exception as e:
         print(f"[readability warmup] {e}")
 
+    # 3) Procesos de inferencia (con los modelos ya cargados, para compartir los pesos)
+    if METRICS_WORKERS > 0:
+        try:
+            start_worker_pool(); print(f"[workers] {pool_stats()}")
+        except Exception as e:
+            print(f"[workers] no se pudo iniciar el pool, se usa el proceso principal: {e}")
+
+@app.on_event("shutdown")
+async def _shutdown():
+    _calibration_executor.shutdown(wait=False)
+    shutdown_executors()
+    shutdown_worker_pool()
+
 # =========================
 # HEALTH
 # =========================
 @app.get("/healthz")
 async def healthz():
     status = {
-        "relevance":  {"model": BERTSCORE_MODEL,   "device": BERT_DEVICE,   "ready": rel_ready()},
-        "factuality": {"model": ALIGNSCORE_MODEL,  "device": ALIGN_DEVICE,  "ready": fac_ready()},
+        "relevance":  {"model": BERTSCORE_MODEL,   "device": BERT_DEVICE,   "ready": rel_ready(), "cache": relevance_cache_stats()},
+        "factuality": {"model": ALIGNSCORE_MODEL,  "device": ALIGN_DEVICE,  "ready": fac_ready(), "errors": fac_error_stats(),
+                       "context_cache": fac_cache_stats()},
         "readability":{"ready": rea_ready()},
+        "threads": thread_budget(),
+        "workers": pool_stats(),
         "targets": {
             "relevance": round(float(TARGET_RELEVANCE), 3),
             "factuality": round(float(TARGET_FACTUALITY), 3),
             "fkgl":       round(float(TARGET_FKGL), 3),
             "smog":       round(float(TARGET_SMOG), 3),
             "dale_chall": round(float(TARGET_DALECHALL), 3),
-        }
+        },
+        "sigmas": {
+            "relevance":  round(float(SIGMA_RELEVANCE), 4),
+            "factuality": round(float(SIGMA_FACTUALITY), 4),
+            "fkgl":       round(float(SIGMA_FKGL), 4),
+            "smog":       round(float(SIGMA_SMOG), 4),
+            "dale_chall": round(float(SIGMA_DALECHALL), 4),
+        },
     }
     if not all((status["relevance"]["ready"], status["factuality"]["ready"], status["readability"]["ready"])):
         from fastapi import Response
@@ -234,18 +474,25 @@ async def healthz():
 @app.post("/metrics/relevance")
 async def relevance(req: RelevanceRequest):
 # handler
-    scores = compute_relevance(req.texts_original, req.texts_generated)
+    scores = await run_metric("relevance", compute_relevance, req.texts_original, req.texts_generated)
     return {"relevance": scores, "model": BERTSCORE_MODEL, "device": BERT_DEVICE}
 
 
 @app.post("/metrics/factuality")
 async def factuality(req: FactualityRequest):
-    scores = compute_factuality(req.texts_original, req.texts_generated)
-    return {"factuality": scores, "model": ALIGNSCORE_MODEL, "device": ALIGN_DEVICE}
+    # None en los pares que fallaron; el motivo queda en errors[i]
+    scores, errors = await run_metric("factuality", compute_factuality_detailed, req.texts_original, req.texts_generated)
+    return {
+        "factuality": scores,
+        "errors": errors,
+        "n_failed": sum(e is not None for e in errors),
+        "model": ALIGNSCORE_MODEL,
+        "device": ALIGN_DEVICE,
+    }
 
 @app.post("/metrics/readability")
 async def readability(req: ReadabilityRequest):
-    scores = compute_readability(req.texts)
+    scores = await run_metric("readability", compute_readability, req.texts)
     return {"fkgl": scores["fkgl"], "smog": scores["smog"], "dale_chall": scores["dale_chall"]}
 
 # =========================
@@ -274,37 +521,223 @@ def _sigmoid_centered_err(x, mu, sigma, y_at_1sigma: float = Y_AT_1SIGMA):
     return 2.0 * np.abs(s - 0.5)
 
 
-@app.post("/loss")
-async def loss(req: LossRequest):
-    n = len(req.texts_generated)
-    if not (len(req.texts_human) == len(req.texts_original) == n):
-        raise HTTPException(status_code=400, detail="Las listas texts_* deben tener igual longitud.")
-    if len(req.weights) != 5:
+def _check_weights(weights: List[float]) -> np.ndarray:
+    if len(weights) != 5:
         raise HTTPException(status_code=400, detail="weights debe tener longitud 5.")
-    w = np.asarray(req.weights, dtype=np.float32)
+    w = np.asarray(weights, dtype=np.float32)
     if not np.isclose(w.sum(), 1.0, atol=1e-6):
         raise HTTPException(status_code=400, detail="La suma de weights debe ser 1.0.")
+    return w
+
+def _needed_components(w: np.ndarray) -> Dict[str, bool]:
+    """Familias de métricas con peso distinto de 0 (las demás no se calculan)."""
+    return {
+        "relevance":   bool(w[0] != 0),
+        "factuality":  bool(w[1] != 0),
+        "readability": bool(np.any(w[2:] != 0)),
+    }
 
-    # --- métricas crudas (orden armonizado) ---
-    rel = np.asarray(compute_relevance(req.texts_original, req.texts_generated), dtype=np.float32) # [0,1]
-    fac  = np.asarray(compute_factuality(req.texts_original, req.texts_generated), dtype=np.float32) # [0,1]
+async def _skipped(value):
+    return value
+
+async def _raw_metrics(originals: List[str], generated: List[str], need: Dict[str, bool]):
+    """
+    Métricas crudas de las familias requeridas, las tres en paralelo.
+    Devuelve (relevance, factuality, factuality_errors, readability); lo omitido queda en 0.
+    """
+    zeros = [0.0] * len(generated)
+    rel, (fac, fac_errors), rd = await asyncio.gather(
+        run_metric("relevance", compute_relevance, originals, generated)
+        if need["relevance"] else _skipped(zeros),
+        run_metric("factuality", compute_factuality_detailed, originals, generated)
+        if need["factuality"] else _skipped((zeros, [None] * len(generated))),
+        run_metric("readability", compute_readability, generated)
+        if need["readability"] else _skipped({"fkgl": zeros, "smog": zeros, "dale_chall": zeros}),
+    )
+    return rel, fac, fac_errors, rd
+
+def _normalized_errors(rel, fac, rd, need: Dict[str, bool]) -> np.ndarray:
+    """Errores normalizados en [0,1] por muestra, columnas [relevance, factuality, fkgl, smog, dale_chall]."""
+    n = len(rel)
+    rel  = np.asarray(rel, dtype=np.float32) # [0,1]
+    # pares en que AlignScore falló: 0.0, igual que compute_factuality
+    fac  = np.asarray([0.0 if f is None else f for f in fac], dtype=np.float32) # [0,1]
 
-    rd   = compute_readability(req.texts_generated)
     fkgl = np.asarray(rd["fkgl"], dtype=np.float32)        # [0, +inf)
     smog = np.asarray(rd["smog"], dtype=np.float32)        # [0, +inf)
     dale = np.asarray(rd["dale_chall"], dtype=np.float32)  # ~[0,16]
 
     # --- errores normalizados en [0,1] ---
     # Relevance / Factuality: L2 directo contra su TARGET (ya en [0,1])
-    e_rel = (rel - float(TARGET_RELEVANCE))**2
-    e_fac = (fac - float(TARGET_FACTUALITY))**2
+    e_rel = (rel - float(TARGET_RELEVANCE))**2 if need["relevance"] else np.zeros(n, dtype=np.float32)
+    e_fac = (fac - float(TARGET_FACTUALITY))**2 if need["factuality"] else np.zeros(n, dtype=np.float32)
 
     # Legibilidad: sigmoide centrada en TARGET_* (0 en el centro)
     e_fkgl = _sigmoid_centered_err(fkgl, TARGET_FKGL, SIGMA_FKGL)
     e_smog = _sigmoid_centered_err(smog, TARGET_SMOG, SIGMA_SMOG)
     e_dale = _sigmoid_centered_err(dale, TARGET_DALECHALL, SIGMA_DALECHALL)
 
-    E = np.stack([e_rel, e_fac, e_fkgl, e_smog, e_dale], axis=1)  # (n,5)
-    loss_per_sample = (E @ w).astype(float)                       # ∈ [0,1]
+    return np.stack([e_rel, e_fac, e_fkgl, e_smog, e_dale], axis=1)  # (n,5)
+
+def _loss_per_sample(rel, fac, rd, w: np.ndarray, need: Dict[str, bool]) -> np.ndarray:
+    E = _normalized_errors(rel, fac, rd, need)
+    return (E @ w).astype(float)                                  # ∈ [0,1]
+
+
+@app.post("/loss")
+async def loss(req: LossRequest, response: Response):
+    n = len(req.texts_generated)
+    if not (len(req.texts_human) == len(req.texts_original) == n):
+        raise HTTPException(status_code=400, detail="Las listas texts_* deben tener igual longitud.")
+    w = _check_weights(req.weights)
+
+    # Las familias cuyo peso es 0 no se calculan (su error queda en 0)
+    need = _needed_components(w)
+    rel, fac, fac_errors, rd = await _raw_metrics(req.texts_original, req.texts_generated, need)
+    response.headers["X-Loss-Components"] = ",".join(k for k, v in need.items() if v)
+    # filas en que AlignScore falló (su factuality cuenta como 0.0 en el loss)
+    response.headers["X-Loss-Failed"] = ",".join(str(i) for i, e in enumerate(fac_errors) if e is not None)
+
+    loss_per_sample = _loss_per_sample(rel, fac, rd, w, need)
+    return float(loss_per_sample[0]) if n == 1 else loss_per_sample.tolist()
+
+@app.post("/metrics/all")
+async def all_metrics(req: AllMetricsRequest):
+    """
+    Métricas crudas, errores normalizados y loss en un solo request: cada métrica se
+    calcula una vez por fila (en lugar de /metrics/* + /loss, que las recalcula).
+    """
+    if len(req.texts_original) != len(req.texts_generated):
+        raise HTTPException(status_code=400, detail="Las listas texts_* deben tener igual longitud.")
+    w = _check_weights(req.weights)
+    need = {"relevance": True, "factuality": True, "readability": True}
+    rel, fac, fac_errors, rd = await _raw_metrics(req.texts_original, req.texts_generated, need)
+
+    E = _normalized_errors(rel, fac, rd, need)
+    return {
+        "relevance":  [float(x) for x in rel],
+        "factuality": fac,
+        "factuality_errors": fac_errors,
+        "n_failed":   sum(e is not None for e in fac_errors),
+        "fkgl":       rd["fkgl"],
+        "smog":       rd["smog"],
+        "dale_chall": rd["dale_chall"],
+        "normalized_errors": {
+            name: E[:, j].astype(float).tolist()
+            for j, name in enumerate(("relevance", "factuality", "fkgl", "smog", "dale_chall"))
+        },
+        "loss": (E @ w).astype(float).tolist(),
+    }
+
+# =========================
+# BULK (NDJSON)
+# =========================
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "32"))
+
+def _ndjson(obj) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+async def _ndjson_lines(request: Request):
+    """Líneas del cuerpo a medida que llegan (sin cargar el archivo completo)."""
+    buf = b""
+    lineno = 0
+    async for chunk in request.stream():
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            lineno += 1
+            yield lineno, line
+    if buf.strip():
+        yield lineno + 1, buf
+
+async def _bulk_batch(batch, w: np.ndarray, need: Dict[str, bool]) -> List[dict]:
+    ids = [rid for rid, _, _ in batch]
+    originals = [o for _, o, _ in batch]
+    generated = [g for _, _, g in batch]
+    try:
+        rel, fac, fac_errors, rd = await _raw_metrics(originals, generated, need)
+        losses = _loss_per_sample(rel, fac, rd, w, need)
+    except Exception as e:
+        print(f"[bulk] error en batch {ids[0]}..{ids[-1]}: {e}")
+        return [{"id": rid, "error": f"{type(e).__name__}: {e}"} for rid in ids]
+
+    rows = []
+    for i, rid in enumerate(ids):
+        rows.append({
+            "id": rid,
+            "relevance":  float(rel[i]) if need["relevance"] else None,
+            "factuality": fac[i] if need["factuality"] else None,
+            "factuality_error": fac_errors[i],
+            "fkgl":       float(rd["fkgl"][i]) if need["readability"] else None,
+            "smog":       float(rd["smog"][i]) if need["readability"] else None,
+            "dale_chall": float(rd["dale_chall"][i]) if need["readability"] else None,
+            "loss":       float(losses[i]),
+        })
+    return rows
+
+@app.post("/metrics/bulk")
+async def bulk(
+    request: Request,
+    weights: str = "0.2,0.2,0.2,0.2,0.2",
+    resume_after: Optional[str] = None,
+    batch_size: int = BULK_BATCH_SIZE,
+):
+    """
+    Evaluación masiva en streaming.
+    Entrada NDJSON, una fila por línea: {"id", "original", "human", "generated"}.
+    Salida NDJSON, una línea por fila con sus métricas y loss (o "error"), a medida que
+    se procesa cada batch, y una línea final {"done": true, ...}.
+    resume_after=<id> omite las filas hasta ese id inclusive (para reanudar un envío cortado).
+    """
+    try:
+        w = _check_weights([float(x) for x in weights.split(",")])
+    except ValueError:
+        raise HTTPException(status_code=400, detail="weights debe ser una lista de 5 números separados por coma.")
+    if batch_size < 1:
+        raise HTTPException(status_code=400, detail="batch_size debe ser >= 1.")
+    need = _needed_components(w)
+
+    async def _events():
+        skipping = resume_after is not None
+        batch = []
+        processed = failed = 0
+        last_id = None
+
+        async def _flush():
+            nonlocal processed, failed, last_id
+            rows = await _bulk_batch(batch, w, need)
+            processed += len(rows)
+            failed += sum("error" in r for r in rows)
+            last_id = rows[-1]["id"]
+            return b"".join(_ndjson(r) for r in rows)
+
+        async for lineno, line in _ndjson_lines(request):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                rid = row.get("id", lineno)
+                original, generated = str(row["original"]), str(row["generated"])
+            except (ValueError, KeyError, AttributeError) as e:
+                failed += 1
+                yield _ndjson({"line": lineno, "error": f"fila inválida: {type(e).__name__}: {e}"})
+                continue
+            if skipping:
+                skipping = str(rid) != str(resume_after)
+                continue
+            batch.append((rid, original, generated))
+            if len(batch) >= batch_size:
+                yield await _flush()
+                batch = []
+        if batch:
+            yield await _flush()
+        yield _ndjson({
+            "done": True,
+            "processed": processed,
+            "failed": failed,
+            "last_id": last_id,
+            "resumed_after": resume_after,
+            "components": [k for k, v in need.items() if v],
+        })
 
-    return float(loss_per_sample[0]) if n == 1 else loss_per_sample.tolist()
\ No newline at end of file
+    return StreamingResponse(_events(), media_type="application/x-ndjson")
\ No newline at end of file
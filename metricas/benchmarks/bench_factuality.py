@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark de throughput de factualidad (AlignScore) antes/después del batching por longitud.
+
+"Antes": AlignScorer.score par a par (batch fijo ALIGNSCORE_BATCH con padding a 512).
+"Después": compute_factuality con filas ordenadas por tokens y batches por presupuesto
+de tokens (ALIGNSCORE_TOKEN_BUDGET).
+
+Como el dataset de test no trae resúmenes, cada texto se compara contra sus primeras
+oraciones (resumen extractivo), que ejercita el mismo camino chunk x oración.
+
+Uso (desde metricas/):
+    python benchmarks/bench_factuality.py --n 64
+"""
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.factuality import _get_scorer, compute_factuality, sent_tokenize  # noqa: E402
+
+DEFAULT_CSV = Path(__file__).resolve().parents[2] / "data" / "cleaned_test_dataset.csv"
+
+
+def load_pairs(csv_path: str, n: int, lead_sents: int):
+    df = pd.read_csv(csv_path)
+    texts = [t for t in df["text"].astype(str).tolist() if t.strip()][:n]
+    claims = [" ".join(sent_tokenize(t)[:lead_sents]) for t in texts]
+    return texts, claims
+
+
+def timed(fn, *args, repeat: int = 1):
+    best, out = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=str(DEFAULT_CSV))
+    parser.add_argument("--n", type=int, default=64, help="cantidad de pares a evaluar")
+    parser.add_argument("--lead-sents", type=int, default=3, help="oraciones del 'resumen' por texto")
+    parser.add_argument("--repeat", type=int, default=1, help="repeticiones (se reporta la mejor)")
+    args = parser.parse_args()
+
+    contexts, claims = load_pairs(args.csv, args.n, args.lead_sents)
+    scorer = _get_scorer()
+    compute_factuality(contexts[:1], claims[:1])  # warmup
+
+    t_before, before = timed(scorer.score, contexts, claims, repeat=args.repeat)
+    t_after, after = timed(compute_factuality, contexts, claims, repeat=args.repeat)
+
+    n = len(contexts)
+    max_diff = max(abs(float(a) - float(b)) for a, b in zip(before, after)) if n else 0.0
+    print(f"pares: {n} | TORCH_NUM_THREADS={os.getenv('TORCH_NUM_THREADS', 'auto')}")
+    print(f"antes  (AlignScorer.score):     {t_before:8.2f}s  {n / t_before:7.2f} pares/s")
+    print(f"después (compute_factuality):   {t_after:8.2f}s  {n / t_after:7.2f} pares/s")
+    print(f"speedup: {t_before / t_after:.2f}x | máx. diferencia de score: {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark de throughput del pool multi-proceso de métricas (METRICS_WORKERS) para
+distintos repartos procesos x threads del mismo presupuesto de CPU.
+
+"0xT" es el modo de un solo proceso (el servicio sin pool) con T threads de PyTorch;
+"PxT" son P procesos de inferencia con T threads cada uno, creados con fork después
+de cargar los modelos. Además del throughput se reporta la memoria PSS total
+(proceso principal + workers) para verificar que los pesos no se duplican.
+
+Las cachés de embeddings y de chunks se desactivan para medir solo inferencia.
+
+Uso (desde metricas/):
+    python benchmarks/bench_workers.py --n 64 --splits 0x8,1x8,2x4,4x2,8x1
+"""
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+os.environ.setdefault("RELEVANCE_CACHE_MAX_MB", "0")
+os.environ.setdefault("ALIGNSCORE_CONTEXT_CACHE_MAX_MB", "0")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import torch  # noqa: E402
+
+from utils.executors import NUM_CPUS  # noqa: E402
+from utils.relevance import compute_relevance, warmup_relevance  # noqa: E402
+from utils.factuality import compute_factuality, warmup_factuality, sent_tokenize  # noqa: E402
+from utils import worker_pool  # noqa: E402
+
+DEFAULT_CSV = Path(__file__).resolve().parents[2] / "data" / "cleaned_test_dataset.csv"
+METRICS = {"relevance": compute_relevance, "factuality": compute_factuality}
+
+
+def load_pairs(csv_path: str, n: int, lead_sents: int):
+    df = pd.read_csv(csv_path)
+    texts = [t for t in df["text"].astype(str).tolist() if t.strip()][:n]
+    claims = [" ".join(sent_tokenize(t)[:lead_sents]) for t in texts]
+    return texts, claims
+
+
+def default_splits(total: int) -> str:
+    splits, p = [f"0x{total}"], 1
+    while p <= total:
+        splits.append(f"{p}x{total // p}")
+        p *= 2
+    return ",".join(splits)
+
+
+def pss_mb(pids) -> float:
+    """Memoria PSS (páginas compartidas prorrateadas) sumada de los procesos, en MB."""
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith("Pss:"))
+        except (OSError, StopIteration):
+            return float("nan")
+    return total / 1024
+
+
+def run_split(workers: int, threads: int, metrics, contexts, claims, repeat: int):
+    if workers == 0:
+        torch.set_num_threads(threads)
+        run = lambda fn: fn(contexts, claims)  # noqa: E731
+    else:
+        worker_pool.start_worker_pool(workers, threads)
+        run = lambda fn: worker_pool.run_pooled_sync(fn, contexts, claims)  # noqa: E731
+    try:
+        for fn in metrics:  # warmup por proceso
+            run(fn) if workers else fn(contexts[:1], claims[:1])
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for fn in metrics:
+                run(fn)
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+        pids = [os.getpid(), *worker_pool.pool_stats().get("pids", [])]
+        return best, pss_mb(pids)
+    finally:
+        worker_pool.shutdown_worker_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=str(DEFAULT_CSV))
+    parser.add_argument("--n", type=int, default=64, help="cantidad de pares a evaluar")
+    parser.add_argument("--lead-sents", type=int, default=3, help="oraciones del 'resumen' por texto")
+    parser.add_argument("--metric", choices=["relevance", "factuality", "both"], default="both")
+    parser.add_argument("--splits", default=default_splits(NUM_CPUS), help="repartos procesos x threads, p.ej. 0x8,2x4,4x2")
+    parser.add_argument("--repeat", type=int, default=1, help="repeticiones (se reporta la mejor)")
+    args = parser.parse_args()
+
+    contexts, claims = load_pairs(args.csv, args.n, args.lead_sents)
+    names = list(METRICS) if args.metric == "both" else [args.metric]
+    # los modelos se cargan una sola vez, antes de cualquier fork
+    if "relevance" in names:
+        warmup_relevance()
+    if "factuality" in names:
+        warmup_factuality()
+
+    n = len(contexts)
+    print(f"pares: {n} | métricas: {', '.join(names)} | CPUs: {NUM_CPUS}")
+    print(f"{'reparto':>8} {'tiempo':>9} {'pares/s':>9} {'PSS total':>11}")
+    baseline = None
+    for split in args.splits.split(","):
+        workers, threads = (int(x) for x in split.lower().split("x"))
+        elapsed, pss = run_split(workers, threads, [METRICS[m] for m in names], contexts, claims, args.repeat)
+        baseline = baseline or elapsed
+        print(f"{split:>8} {elapsed:8.2f}s {n / elapsed:9.2f} {pss:8.0f} MB   ({baseline / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,122 +1,577 @@
 # metrics_client.py
 from __future__ import annotations
 import os
-from typing import Sequence, Union, List, Dict, Any
+import json
+import atexit
+import time
+import random
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from typing import Sequence, Union, List, Dict, Any, Awaitable, Callable, Iterable, Iterator, Optional
+import httpx
 import requests
-from urllib3.util.retry import Retry
 from requests.adapters import HTTPAdapter
 
 Json = Dict[str, Any]
 StrOrSeq = Union[str, Sequence[str]]
+ProgressFn = Callable[[int, int], None]
 
 _DEFAULT_URL = os.getenv("METRICS_API_URL", "http://127.0.0.1:8000")
 
-# ---- Session robusta (retries + pool + backoff) ----
-_session = requests.Session()
-_retry = Retry(
-    total=5,               # reintentos totales
-    connect=3,             # errores de conexión
-    read=3,                # errores de lectura
-    backoff_factor=0.5,    # 0.5, 1.0, 2.0, ...
-    status_forcelist=[502, 503, 504],
-    allowed_methods=["GET", "POST"],
-    raise_on_status=False,
-)
-_adapter = HTTPAdapter(max_retries=_retry, pool_connections=10, pool_maxsize=20)
-_session.mount("http://", _adapter)
-_session.mount("https://", _adapter)
-
-# Siempre cerramos la conexión para evitar sockets colgados en Windows
-_DEFAULT_HEADERS = {"Connection": "close", "Accept": "application/json"}
+# ---- Envío en chunks: filas por request, requests simultáneos y reintentos por chunk ----
+_CHUNK_SIZE = int(os.getenv("METRICS_CLIENT_CHUNK_SIZE", "32"))
+_CONCURRENCY = int(os.getenv("METRICS_CLIENT_CONCURRENCY", "4"))
+_RETRIES = int(os.getenv("METRICS_CLIENT_RETRIES", "3"))
+_BACKOFF = 0.5                      # 0.5, 1.0, 2.0, ... (+ jitter)
+_RETRY_STATUS = {502, 503, 504}
+# Segundos durante los que la caché reutiliza la huella de /healthz (0 = consultarla en cada llamada)
+_HEALTH_TTL = float(os.getenv("METRICS_CLIENT_HEALTH_TTL", "30"))
+
+# ---- Session de iterBulk, sin reintentos: el cuerpo es un generador que ya se consumió y
+# un reintento reenviaría un body vacío. Ante un corte se reanuda con resume_after. ----
+_bulk_session = requests.Session()
+_bulk_adapter = HTTPAdapter(max_retries=0, pool_connections=10, pool_maxsize=20)
+_bulk_session.mount("http://", _bulk_adapter)
+_bulk_session.mount("https://", _bulk_adapter)
+
+# Conexiones keep-alive: el pool reutiliza el mismo socket entre chunks
+_DEFAULT_HEADERS = {"Accept": "application/json"}
 
 def _to_list(x: StrOrSeq) -> List[str]:
     if isinstance(x, str):
         return [x]
     return list(x)
 
-def _post(base_url: str, path: str, payload: Json, timeout: float = 180.0) -> Any:
-    url = f"{base_url.rstrip('/')}{path}"
+def _normalize_weights(weights: Sequence[float] | None) -> List[float]:
+    w = list(weights) if weights is not None else [0.2, 0.2, 0.2, 0.2, 0.2]
+    if len(w) != 5:
+        raise ValueError("weights debe tener longitud 5")
+    s = sum(w)
+    if abs(s - 1.0) > 1e-6:
+        w = [wi / s for wi in w]
+    return w
+
+# ---- Caché local persistente de resultados por fila (opcional) ----
+class MetricsCache:
+    """
+    Resultados por fila en SQLite, indexados por endpoint, textos, parámetros y la
+    "huella" del servidor (modelos y targets reportados por /healthz). Cuando la huella
+    cambia, las filas calculadas con la anterior se descartan.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS metrics ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, fingerprint TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._fingerprint: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def set_fingerprint(self, fingerprint: str) -> str:
+        with self._lock:
+            if fingerprint == self._fingerprint:
+                return fingerprint
+            cur = self._conn.execute("DELETE FROM metrics WHERE fingerprint != ?", (fingerprint,))
+            if cur.rowcount > 0:
+                self.invalidations += 1
+            self._fingerprint = fingerprint
+            return fingerprint
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        unique = list(dict.fromkeys(keys))
+        found: Dict[str, Any] = {}
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                part = unique[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM metrics WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                found.update((k, json.loads(v)) for k, v in rows)
+            self.hits += sum(1 for k in keys if k in found)
+            self.misses += sum(1 for k in keys if k not in found)
+        return found
+
+    def put_many(self, items: Dict[str, Any]) -> None:
+        if not items:
+            return
+        now = time.time()
+        rows = [(k, json.dumps(v), self._fingerprint or "", now) for k, v in items.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO metrics (key, value, fingerprint, created) VALUES (?, ?, ?, ?)", rows
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM metrics")
+
+    def stats(self) -> Json:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM metrics").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path, "entries": entries, "hits": self.hits, "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0, "invalidations": self.invalidations,
+        }
+
+_cache: Optional[MetricsCache] = None
+
+def enableCache(path: str = "metrics_cache.sqlite3") -> Json:
+    """Activa la caché local en `path`: solo las filas no vistas se envían al servidor."""
+    global _cache
+    _cache = MetricsCache(path)
+    return _cache.stats()
+
+def disableCache() -> None:
+    global _cache
+    _cache = None
+
+def clearCache() -> None:
+    _fingerprints.clear()
+    if _cache is not None:
+        _cache.clear()
+
+def cacheStats() -> Optional[Json]:
+    return _cache.stats() if _cache is not None else None
+
+if os.getenv("METRICS_CLIENT_CACHE"):
+    enableCache(os.environ["METRICS_CLIENT_CACHE"])
+
+def _server_fingerprint(health: Json) -> str:
+    relevant = {
+        "relevance": health.get("relevance", {}).get("model"),
+        "factuality": health.get("factuality", {}).get("model"),
+        "targets": health.get("targets"),
+        "sigmas": health.get("sigmas"),
+    }
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode("utf-8")).hexdigest()
+
+_fingerprints: Dict[str, tuple] = {}  # base_url -> (huella, time.monotonic() de la consulta)
+
+async def _fingerprint(base_url: str) -> str:
+    """Huella del servidor, consultando /healthz a lo sumo una vez cada _HEALTH_TTL segundos."""
+    hit = _fingerprints.get(base_url)
+    if hit is not None and time.monotonic() - hit[1] < _HEALTH_TTL:
+        return hit[0]
+    fingerprint = _server_fingerprint(await agetHealth(base_url))
+    _fingerprints[base_url] = (fingerprint, time.monotonic())
+    return fingerprint
+
+def _row_key(endpoint: str, fingerprint: str, params: Json, texts: List[str]) -> str:
+    payload = json.dumps([endpoint, fingerprint, params, texts], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+async def _cached_rows(
+    base_url: str,
+    endpoint: str,
+    columns: Dict[str, List[str]],
+    fetch: Callable[[Dict[str, List[str]]], Awaitable[List[Any]]],
+    params: Optional[Json] = None,
+    cacheable: Callable[[Any], bool] = lambda v: v is not None,
+) -> List[Any]:
+    """
+    Resultado por fila de `fetch(columns)`, pidiendo al servidor solo las filas que no
+    están en la caché (las repetidas dentro del mismo llamado se envían una vez).
+    Solo se guardan las filas para las que `cacheable(fila)` es True.
+    """
+    cache = _cache
+    if cache is None:
+        return await fetch(columns)
     try:
-        r = _session.post(url, json=payload, timeout=timeout, headers=_DEFAULT_HEADERS)
-        r.raise_for_status()
-    except requests.RequestException as e:
-        raise RuntimeError(f"POST {url} failed: {e}") from e
+        fingerprint = cache.set_fingerprint(await _fingerprint(base_url))
+    except RuntimeError as e:
+        print(f"[metrics_client] caché omitida, /healthz no respondió: {e}")
+        return await fetch(columns)
+
+    n = len(next(iter(columns.values())))
+    keys = [_row_key(endpoint, fingerprint, params or {}, [v[i] for v in columns.values()]) for i in range(n)]
+    found = cache.get_many(keys)
+    first: Dict[str, int] = {}
+    for i, k in enumerate(keys):
+        if k not in found:
+            first.setdefault(k, i)
+    if first:
+        miss = list(first.values())
+        results = await fetch({c: [v[i] for i in miss] for c, v in columns.items()})
+        fresh = dict(zip(first, results))
+        # las fallas (p.ej. None de AlignScore) no se guardan: se reintentan en la próxima llamada
+        cache.put_many({k: v for k, v in fresh.items() if cacheable(v)})
+        found.update(fresh)
+    return [found[k] for k in keys]
+
+# ---- Event loop de fondo de las funciones sincrónicas ----
+# Un loop persistente en un thread daemon, con un httpx.AsyncClient que vive entre llamadas:
+# las conexiones keep-alive se reutilizan de un getLoss al siguiente.
+_bg_lock = threading.Lock()
+_bg_loop: Optional[asyncio.AbstractEventLoop] = None
+_bg_client: Optional[httpx.AsyncClient] = None
+_bg_pid = 0
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _bg_loop, _bg_client, _bg_pid
+    with _bg_lock:
+        # después de un fork el thread del loop no existe en el hijo: se crea otro
+        if _bg_loop is None or _bg_pid != os.getpid():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="metrics-client-loop", daemon=True).start()
+            _bg_loop, _bg_client, _bg_pid = loop, None, os.getpid()
+        return _bg_loop
+
+def _shared_client() -> Optional[httpx.AsyncClient]:
+    """Cliente persistente cuando la corrutina corre en el loop de fondo; None en cualquier otro loop."""
+    global _bg_client
     try:
-        return r.json()
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    if running is not _bg_loop or _bg_pid != os.getpid():
+        return None
+    # solo el thread del loop llega hasta aquí: no hace falta lock
+    if _bg_client is None or _bg_client.is_closed:
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=max(_CONCURRENCY, 8))
+        _bg_client = httpx.AsyncClient(limits=limits, headers=_DEFAULT_HEADERS)
+    return _bg_client
+
+def _close_background_loop() -> None:
+    loop = _bg_loop
+    if loop is None or _bg_pid != os.getpid():
+        return
+    try:
+        if _bg_client is not None:
+            asyncio.run_coroutine_threadsafe(_bg_client.aclose(), loop).result(timeout=5)
+    except Exception:
+        pass
+    loop.call_soon_threadsafe(loop.stop)
+
+atexit.register(_close_background_loop)
+
+def _run_sync(coro):
+    """Ejecuta una corrutina desde código sincrónico (también dentro de un event loop, p.ej. Jupyter) en el loop de fondo."""
+    loop = _background_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("las funciones sincrónicas no pueden llamarse desde on_progress; usar las versiones aget*")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+def _new_client(timeout: float, concurrency: int) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    return httpx.AsyncClient(timeout=timeout, limits=limits, headers=_DEFAULT_HEADERS)
+
+async def _apost(
+    client: httpx.AsyncClient, url: str, payload: Json, retries: int, timeout: float, with_headers: bool = False,
+) -> Any:
+    """
+    POST con reintentos (errores de conexión/lectura y 502/503/504) y backoff exponencial.
+    Con with_headers devuelve (cuerpo, headers de la respuesta).
+    """
+    for attempt in range(retries + 1):
+        try:
+            r = await client.post(url, json=payload, timeout=timeout)
+            if r.status_code in _RETRY_STATUS and attempt < retries:
+                raise httpx.HTTPStatusError(f"HTTP {r.status_code}", request=r.request, response=r)
+            r.raise_for_status()
+            break
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            retryable = isinstance(e, httpx.TransportError) or e.response.status_code in _RETRY_STATUS
+            if not retryable or attempt >= retries:
+                raise RuntimeError(f"POST {url} failed: {e}") from e
+            await asyncio.sleep(_BACKOFF * (2 ** attempt) * (1 + random.random() / 2))
+    try:
+        body = r.json()
     except ValueError:
-        return r.text
+        body = r.text
+    return (body, r.headers) if with_headers else body
 
-def getHealth(base_url: str = _DEFAULT_URL, timeout: float = 30.0) -> Json:
+async def _apost_chunked(
+    base_url: str,
+    path: str,
+    columns: Dict[str, List[Any]],
+    extra: Optional[Json] = None,
+    *,
+    timeout: float,
+    chunk_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    retries: Optional[int] = None,
+    on_progress: Optional[ProgressFn] = None,
+    client: Optional[httpx.AsyncClient] = None,
+    with_headers: bool = False,
+) -> List[Any]:
+    """
+    Parte las columnas (listas alineadas por fila) en chunks de chunk_size filas y los envía
+    con a lo sumo `concurrency` requests en vuelo. Devuelve las respuestas en el orden de los chunks
+    (pares (cuerpo, headers) con with_headers).
+    """
+    chunk_size = max(1, chunk_size or _CHUNK_SIZE)
+    concurrency = max(1, concurrency or _CONCURRENCY)
+    retries = _RETRIES if retries is None else retries
+    url = f"{base_url.rstrip('/')}{path}"
+    n = len(next(iter(columns.values()))) if columns else 0
+    starts = list(range(0, n, chunk_size)) or [0]
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def _one(c: httpx.AsyncClient, i: int) -> Any:
+        nonlocal done
+        j = min(i + chunk_size, n)
+        payload = {k: v[i:j] for k, v in columns.items()}
+        payload.update(extra or {})
+        async with semaphore:
+            out = await _apost(c, url, payload, retries, timeout, with_headers)
+        done += j - i
+        if on_progress:
+            on_progress(done, n)
+        return out
+
+    client = client or _shared_client()
+    if client is not None:
+        return list(await asyncio.gather(*(_one(client, i) for i in starts)))
+    async with _new_client(timeout, concurrency) as c:
+        return list(await asyncio.gather(*(_one(c, i) for i in starts)))
+
+async def agetHealth(base_url: str = _DEFAULT_URL, timeout: float = 30.0) -> Json:
     url = f"{base_url.rstrip('/')}/healthz"
-    try:
-        r = _session.get(url, timeout=timeout, headers=_DEFAULT_HEADERS)
-        r.raise_for_status()
-    except requests.RequestException as e:
-        raise RuntimeError(f"GET {url} failed: {e}") from e
-    return r.json()
 
-def getRelevance(
+    async def _get(c: httpx.AsyncClient) -> Json:
+        try:
+            r = await c.get(url, timeout=timeout)
+            r.raise_for_status()
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"GET {url} failed: {e}") from e
+        return r.json()
+
+    shared = _shared_client()
+    if shared is not None:
+        return await _get(shared)
+    async with _new_client(timeout, 1) as c:
+        return await _get(c)
+
+async def agetRelevance(
     originals: StrOrSeq,
     generated: StrOrSeq,
     base_url: str = _DEFAULT_URL,
     timeout: float = 180.0,
+    **options,
 ) -> List[float]:
+    """
+    Versión asíncrona de getRelevance. options: chunk_size, concurrency, retries,
+    on_progress(hechas, total) y client (un httpx.AsyncClient propio para reutilizar conexiones).
+    """
     o, g = _to_list(originals), _to_list(generated)
     if len(o) != len(g):
         raise ValueError("originals y generated deben tener la misma longitud")
-    payload = {"texts_original": o, "texts_generated": g}
-    out = _post(base_url, "/metrics/relevance", payload, timeout)
-    return list(out["relevance"])
 
-def getFactuality(
+    async def _fetch(cols: Dict[str, List[str]]) -> List[float]:
+        outs = await _apost_chunked(base_url, "/metrics/relevance", cols, timeout=timeout, **options)
+        return [x for out in outs for x in out["relevance"]]
+
+    return await _cached_rows(base_url, "relevance", {"texts_original": o, "texts_generated": g}, _fetch)
+
+async def agetFactuality(
     originals: StrOrSeq,
     generated: StrOrSeq,
     base_url: str = _DEFAULT_URL,
     timeout: float = 900.0,
-) -> List[float]:
+    **options,
+) -> List[float | None]:
+    """Versión asíncrona de getFactuality (mismas options que agetRelevance)."""
     o, g = _to_list(originals), _to_list(generated)
     if len(o) != len(g):
         raise ValueError("originals y generated deben tener la misma longitud")
-    payload = {"texts_original": o, "texts_generated": g}
-    out = _post(base_url, "/metrics/factuality", payload, timeout)
-    return list(out["factuality"])
 
-def getReadability(
+    async def _fetch(cols: Dict[str, List[str]]) -> List[float | None]:
+        outs = await _apost_chunked(base_url, "/metrics/factuality", cols, timeout=timeout, **options)
+        return [x for out in outs for x in out["factuality"]]
+
+    return await _cached_rows(base_url, "factuality", {"texts_original": o, "texts_generated": g}, _fetch)
+
+async def agetReadability(
     texts: StrOrSeq,
     base_url: str = _DEFAULT_URL,
     timeout: float = 120.0,
+    **options,
 ) -> Dict[str, List[float]]:
+    """Versión asíncrona de getReadability (mismas options que agetRelevance)."""
     t = _to_list(texts)
-    payload = {"texts": t}
-    out = _post(base_url, "/metrics/readability", payload, timeout)
-    return {"fkgl": list(out["fkgl"]), "smog": list(out["smog"]), "dale_chall": list(out["dale_chall"])}
+    keys = ("fkgl", "smog", "dale_chall")
 
-def getLoss(
+    async def _fetch(cols: Dict[str, List[str]]) -> List[Dict[str, float]]:
+        outs = await _apost_chunked(base_url, "/metrics/readability", cols, timeout=timeout, **options)
+        return [dict(zip(keys, vals)) for out in outs for vals in zip(*(out[k] for k in keys))]
+
+    rows = await _cached_rows(base_url, "readability", {"texts": t}, _fetch)
+    return {k: [r[k] for r in rows] for k in keys}
+
+async def agetLoss(
     originals: StrOrSeq,
     humans: StrOrSeq,
     generated: StrOrSeq,
     weights: Sequence[float] | None = None,
     base_url: str = _DEFAULT_URL,
     timeout: float = 900.0,
+    **options,
 ) -> Union[float, List[float]]:
+    """Versión asíncrona de getLoss (mismas options que agetRelevance)."""
     o, h, g = _to_list(originals), _to_list(humans), _to_list(generated)
     if not (len(o) == len(h) == len(g)):
         raise ValueError("originals, humans y generated deben tener la misma longitud")
-    w = list(weights) if weights is not None else [0.2, 0.2, 0.2, 0.2, 0.2]
-    if len(w) != 5:
-        raise ValueError("weights debe tener longitud 5")
-    s = sum(w)
-    if abs(s - 1.0) > 1e-6:
-        w = [wi / s for wi in w]
+    w = _normalize_weights(weights)
+    columns = {"texts_original": o, "texts_human": h, "texts_generated": g}
 
-    payload = {
-        "texts_original": o,
-        "texts_human": h,
-        "texts_generated": g,
-        "weights": w,
-    }
-    out = _post(base_url, "/loss", payload, timeout)
-    return out  # float si n==1, list si n>1
+    async def _fetch(cols: Dict[str, List[str]]) -> List[List[Any]]:
+        outs = await _apost_chunked(
+            base_url, "/loss", cols, {"weights": w}, timeout=timeout, with_headers=True, **options
+        )
+        rows = []
+        for out, headers in outs:
+            # X-Loss-Failed: índices (dentro del chunk) de las filas en que AlignScore falló
+            failed = {int(i) for i in headers.get("X-Loss-Failed", "").split(",") if i}
+            # el servidor devuelve float para un chunk de una fila
+            values = out if isinstance(out, list) else [out]
+            rows.extend([x, i in failed] for i, x in enumerate(values))
+        return rows
+
+    rows = await _cached_rows(base_url, "loss", columns, _fetch, {"weights": w}, cacheable=lambda r: not r[1])
+    losses = [r[0] for r in rows]
+    return losses[0] if len(losses) == 1 else losses  # float si n==1, list si n>1
+
+_ALL_COLUMNS = ("relevance", "factuality", "factuality_errors", "fkgl", "smog", "dale_chall", "loss")
+_ERROR_COLUMNS = ("relevance", "factuality", "fkgl", "smog", "dale_chall")
+
+async def agetAllMetrics(
+    originals: StrOrSeq,
+    generated: StrOrSeq,
+    weights: Sequence[float] | None = None,
+    base_url: str = _DEFAULT_URL,
+    timeout: float = 900.0,
+    **options,
+) -> Json:
+    """Versión asíncrona de getAllMetrics (mismas options que agetRelevance)."""
+    o, g = _to_list(originals), _to_list(generated)
+    if len(o) != len(g):
+        raise ValueError("originals y generated deben tener la misma longitud")
+    w = _normalize_weights(weights)
+
+    async def _fetch(cols: Dict[str, List[str]]) -> List[Json]:
+        outs = await _apost_chunked(base_url, "/metrics/all", cols, {"weights": w}, timeout=timeout, **options)
+        rows = []
+        for out in outs:
+            for i in range(len(out["loss"])):
+                row = {k: out[k][i] for k in _ALL_COLUMNS}
+                row["normalized_errors"] = {k: out["normalized_errors"][k][i] for k in _ERROR_COLUMNS}
+                rows.append(row)
+        return rows
+
+    rows = await _cached_rows(
+        base_url, "all", {"texts_original": o, "texts_generated": g}, _fetch, {"weights": w},
+        cacheable=lambda r: r["factuality"] is not None,
+    )
+    out: Json = {k: [r[k] for r in rows] for k in _ALL_COLUMNS}
+    out["n_failed"] = sum(e is not None for e in out["factuality_errors"])
+    out["normalized_errors"] = {k: [r["normalized_errors"][k] for r in rows] for k in _ERROR_COLUMNS}
+    return out
+
+def getHealth(base_url: str = _DEFAULT_URL, timeout: float = 30.0) -> Json:
+    return _run_sync(agetHealth(base_url, timeout))
+
+def getRelevance(
+    originals: StrOrSeq,
+    generated: StrOrSeq,
+    base_url: str = _DEFAULT_URL,
+    timeout: float = 180.0,
+    **options,
+) -> List[float]:
+    return _run_sync(agetRelevance(originals, generated, base_url, timeout, **options))
+
+def getFactuality(
+    originals: StrOrSeq,
+    generated: StrOrSeq,
+    base_url: str = _DEFAULT_URL,
+    timeout: float = 900.0,
+    **options,
+) -> List[float | None]:
+    """Puntajes por par; None donde AlignScore falló para ese par."""
+    return _run_sync(agetFactuality(originals, generated, base_url, timeout, **options))
+
+def getReadability(
+    texts: StrOrSeq,
+    base_url: str = _DEFAULT_URL,
+    timeout: float = 120.0,
+    **options,
+) -> Dict[str, List[float]]:
+    return _run_sync(agetReadability(texts, base_url, timeout, **options))
+
+def getLoss(
+    originals: StrOrSeq,
+    humans: StrOrSeq,
+    generated: StrOrSeq,
+    weights: Sequence[float] | None = None,
+    base_url: str = _DEFAULT_URL,
+    timeout: float = 900.0,
+    **options,
+) -> Union[float, List[float]]:
+    return _run_sync(agetLoss(originals, humans, generated, weights, base_url, timeout, **options))
+
+def getAllMetrics(
+    originals: StrOrSeq,
+    generated: StrOrSeq,
+    weights: Sequence[float] | None = None,
+    base_url: str = _DEFAULT_URL,
+    timeout: float = 900.0,
+    **options,
+) -> Json:
+    """
+    Relevance, factuality (None donde falló), fkgl, smog, dale_chall, errores normalizados
+    y loss por fila, calculando cada métrica una sola vez (POST /metrics/all).
+    """
+    return _run_sync(agetAllMetrics(originals, generated, weights, base_url, timeout, **options))
+
+def iterBulk(
+    rows: Iterable[Json],
+    weights: Sequence[float] | None = None,
+    resume_after: Optional[Union[str, int]] = None,
+    batch_size: Optional[int] = None,
+    base_url: str = _DEFAULT_URL,
+    timeout: float = 300.0,
+) -> Iterator[Json]:
+    """
+    Envía filas {"id", "original", "human", "generated"} a /metrics/bulk en streaming
+    y va entregando el resultado de cada fila a medida que llega. La última línea es
+    {"done": true, "last_id": ...}; si el envío se corta, reanudar con resume_after=<último id recibido>.
+    timeout aplica entre líneas recibidas, no al total.
+    """
+    w = _normalize_weights(weights)
+    params: Json = {"weights": ",".join(str(x) for x in w)}
+    if resume_after is not None:
+        params["resume_after"] = str(resume_after)
+    if batch_size is not None:
+        params["batch_size"] = int(batch_size)
+
+    def _body():
+        for row in rows:
+            yield (json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8")
+
+    url = f"{base_url.rstrip('/')}/metrics/bulk"
+    headers = {**_DEFAULT_HEADERS, "Content-Type": "application/x-ndjson", "Accept": "application/x-ndjson"}
+    try:
+        with _bulk_session.post(url, params=params, data=_body(), headers=headers, stream=True, timeout=timeout) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if line:
+                    yield json.loads(line)
+    except requests.RequestException as e:
+        raise RuntimeError(f"POST {url} failed: {e}") from e
 
 # Alias útil sólo cuando comparas dos listas: 'humans' y 'generated' (misma longitud).
 def getLossPair(humans: StrOrSeq, generated: StrOrSeq, **kwargs) -> float | List[float]:
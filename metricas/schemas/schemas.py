@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 class RelevanceRequest(BaseModel):
     texts_original: List[str]
@@ -18,3 +18,18 @@ class LossRequest(BaseModel):
     texts_human: List[str]
     texts_generated: List[str]
     weights: List[float]
+
+class AllMetricsRequest(BaseModel):
+    texts_original: List[str]
+    texts_generated: List[str]
+    weights: List[float] = [0.2, 0.2, 0.2, 0.2, 0.2]
+
+
+class CalibrationRequest(BaseModel):
+    path: str                       # CSV con columnas source_text, target_text y split
+    subset: float = 1.0
+    seed: int = 42
+    chunk_size: int = 16
+    save_to: Optional[str] = None   # por defecto TARGETS_FILE
+    apply: bool = True              # reemplazar TARGET_*/SIGMA_* en memoria al terminar
+    merge_with: Optional[str] = None  # targets.json previo con "stats": solo se calculan las filas nuevas
\ No newline at end of file
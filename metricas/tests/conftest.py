@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+import pytest
+
+# Los módulos de métricas se importan como en app.py (desde metricas/)
+METRICAS_DIR = Path(__file__).resolve().parents[1]
+REPO_DIR = METRICAS_DIR.parent
+sys.path.insert(0, str(METRICAS_DIR))
+
+TEXT_CSVS = [
+    "data/cleaned_train_dataset.csv",
+    "data/cleaned_val_dataset.csv",
+    "data/cleaned_test_dataset.csv",
+    "data/cochrane_sample_large.csv",
+    *sorted(str(p.relative_to(REPO_DIR)) for p in (REPO_DIR / "generacion" / "GENERATED_TEXTS").glob("*generations*.csv")),
+]
+
+
+def _text_columns(df: pd.DataFrame) -> List[str]:
+    return [c for c in df.columns if c in ("text", "source_text", "target_text") or c.startswith("gen_") and df[c].dtype == object]
+
+
+@pytest.fixture(scope="session", params=TEXT_CSVS)
+def repo_texts(request) -> List[str]:
+    """Textos (originales, resúmenes humanos y generados) de un CSV del repositorio."""
+    df = pd.read_csv(REPO_DIR / request.param)
+    return [str(t) for c in _text_columns(df) for t in df[c].dropna()]
@@ -0,0 +1,57 @@
+from typing import List
+
+import pytest
+
+pytest.importorskip("alignscore")
+
+from utils import factuality  # noqa: E402
+
+
+class StubScorer:
+    """Puntúa cada par con len(claim) / 100 y falla en todo batch que contenga un claim con "BAD"."""
+
+    def __init__(self):
+        self.batches: List[int] = []
+
+    def score(self, contexts: List[str], claims: List[str]) -> List[float]:
+        self.batches.append(len(claims))
+        if any("BAD" in c for c in claims):
+            raise ValueError("claim inválido")
+        return [len(c) / 100 for c in claims]
+
+
+@pytest.fixture
+def stub_scorer(monkeypatch) -> StubScorer:
+    scorer = StubScorer()
+    monkeypatch.setattr(factuality, "_get_scorer", lambda: scorer)
+    monkeypatch.setattr(factuality, "ALIGNSCORE_BUCKETING", False)
+    monkeypatch.setattr(factuality, "_error_stats", {"pairs_scored": 0, "pairs_failed": 0, "batch_failures": 0})
+    return scorer
+
+
+def test_failing_pair_is_isolated_and_order_kept(stub_scorer) -> None:
+    # Given
+    originals = ["ctx a", "ctx b", "ctx c", "ctx d", "   ", "ctx f"]
+    generated = ["one", "three", "a BAD claim", "seven", "empty context", "eleven words"]
+
+    # When
+    scores, errors = factuality.compute_factuality_detailed(originals, generated)
+
+    # Then
+    assert scores == [0.03, 0.05, None, 0.05, 0.0, 0.12]
+    assert errors == [None, None, "ValueError: claim inválido", None, None, None]
+    assert factuality.compute_factuality(originals, generated)[2] == 0.0
+
+
+def test_error_stats_count_scored_failed_and_batches(stub_scorer) -> None:
+    # Given
+    originals = ["ctx"] * 5
+    generated = ["ok 1", "ok 2", "BAD", "ok 4", "ok 5"]
+
+    # When
+    factuality.compute_factuality_detailed(originals, generated)
+
+    # Then
+    # 5 pares fallan -> [0,1] bien, [2,3,4] falla -> [2] falla, [3,4] bien
+    assert stub_scorer.batches == [5, 2, 3, 1, 2]
+    assert factuality.error_stats() == {"pairs_scored": 4, "pairs_failed": 1, "batch_failures": 3}
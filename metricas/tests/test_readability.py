@@ -0,0 +1,47 @@
+import textstat
+
+from utils.readability import compute_readability
+
+EDGE_CASES = [
+    "",
+    "warmup",
+    "Hi.",
+    "One sentence only, with a few words",
+    "Short. Tiny. Ok! Then a much longer sentence follows here? Yes, it does.",
+    "It's the patients' well-being; e.g. 5.5 mg/kg — (n = 120) vs. placebo...",
+    "Überraschung: naïve café-goers’ résumés “quoted” — 3rd-line therapy.",
+]
+
+
+def _textstat_scores(texts):
+    return {
+        "fkgl": [float(textstat.flesch_kincaid_grade(t)) for t in texts],
+        "smog": [float(textstat.smog_index(t)) for t in texts],
+        "dale_chall": [float(textstat.dale_chall_readability_score(t)) for t in texts],
+    }
+
+
+def test_readability_matches_textstat_on_repo_csvs(repo_texts) -> None:
+    # Given
+    expected = _textstat_scores(repo_texts)
+
+    # When
+    scores = compute_readability(repo_texts)
+
+    # Then
+    for metric in ("fkgl", "smog", "dale_chall"):
+        mismatches = [
+            (i, scores[metric][i], expected[metric][i])
+            for i in range(len(repo_texts))
+            if scores[metric][i] != expected[metric][i]
+        ]
+        assert not mismatches, f"{metric}: {mismatches[:5]}"
+
+
+def test_readability_matches_textstat_on_edge_cases() -> None:
+    # When
+    scores = compute_readability(EDGE_CASES)
+
+    # Then
+    assert scores == _textstat_scores(EDGE_CASES)
+    assert compute_readability([]) == {"fkgl": [], "smog": [], "dale_chall": []}
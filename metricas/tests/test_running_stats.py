@@ -0,0 +1,72 @@
+import json
+
+import numpy as np
+
+from utils.running_stats import RunningStats
+
+
+def _values(n: int = 3000, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(13.5, 2.0, n)
+
+
+def test_merged_shards_match_full_pass() -> None:
+    # Given
+    x = _values()
+    shards = [x[:7], x[7:1200], x[1200:]]
+
+    # When
+    merged = RunningStats()
+    for shard in shards:
+        merged.merge(RunningStats().update(shard))
+
+    # Then
+    assert merged.count == x.size
+    assert np.isclose(merged.mean, x.mean(), rtol=0, atol=1e-12)
+    assert np.isclose(merged.std, np.std(x, ddof=1), rtol=0, atol=1e-12)
+
+
+def test_incremental_update_matches_full_pass() -> None:
+    # Given
+    x = _values(seed=1)
+    stats = RunningStats().update(x[:2000])
+
+    # When: agregar filas nuevas no vuelve a recorrer las anteriores
+    stats.update(x[2000:])
+
+    # Then
+    assert np.isclose(stats.mean, x.mean(), rtol=0, atol=1e-12)
+    assert np.isclose(stats.std, np.std(x, ddof=1), rtol=0, atol=1e-12)
+
+
+def test_round_trip_through_json_keeps_sketch() -> None:
+    # Given
+    x = _values(seed=2)
+    stats = RunningStats().update(x)
+
+    # When
+    loaded = RunningStats.from_dict(json.loads(json.dumps(stats.to_dict())))
+
+    # Then
+    assert (loaded.count, loaded.mean, loaded.m2) == (stats.count, stats.mean, stats.m2)
+    for q in (0.05, 0.5, 0.95):
+        assert abs(loaded.quantile(q) - np.quantile(x, q)) < 0.05
+
+
+def test_sketch_dropped_when_one_side_has_none() -> None:
+    # Given
+    with_sketch = RunningStats().update([1.0, 2.0, 3.0])
+    without_sketch = RunningStats(sketch_size=0).update([4.0, 5.0])
+
+    # When
+    with_sketch.merge(without_sketch)
+
+    # Then
+    assert with_sketch.quantile(0.5) is None
+    assert with_sketch.count == 5 and with_sketch.mean == 3.0
+
+
+def test_empty_and_single_value() -> None:
+    assert RunningStats().std == 0.0
+    assert RunningStats().quantile(0.5) is None
+    single = RunningStats().update([float("nan"), 2.5])
+    assert (single.count, single.mean, single.std) == (1, 2.5, 0.0)
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import threading
+import time
+from typing import List
+
+import pytest
+
+from utils import worker_pool
+from utils.executors import _executors
+
+
+def _double(values: List[int]) -> List[int]:
+    # una fila negativa mata el proceso que la procesa, como un OOM o un segfault
+    if any(v < 0 for v in values) and os.getpid() != _PARENT_PID:
+        os._exit(1)
+    return [2 * abs(v) for v in values]
+
+
+_PARENT_PID = os.getpid()
+# hace de ``_score_lock``: lo toma un forward en curso en el proceso principal
+_model_lock = threading.Lock()
+
+
+def _lock_free(values: List[int]) -> List[bool]:
+    return [not _model_lock.locked() for _ in values]
+
+
+def _busy_forward(started: threading.Event, release: threading.Event) -> None:
+    with _model_lock:
+        started.set()
+        release.wait(5)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(worker_pool, "METRICS_WORKER_MIN_ROWS", 1)
+    monkeypatch.setattr(worker_pool, "_restarts", 0)
+    monkeypatch.setattr(worker_pool, "_failures", 0)
+    monkeypatch.setattr(worker_pool, "_last_error", None)
+    worker_pool.start_worker_pool(2, 1)
+    yield worker_pool
+    worker_pool.shutdown_worker_pool()
+
+
+def test_dead_worker_rebuilds_pool_and_keeps_results(pool) -> None:
+    # Given
+    old_pids = pool.pool_stats()["pids"]
+
+    # When
+    out = asyncio.run(pool.run_pooled(_double, [1, 2, -3, 4], family="readability"))
+
+    # Then
+    assert out == [2, 4, 6, 8]
+    stats = pool.pool_stats()
+    assert stats["healthy"] and stats["restarts"] == 1 and stats["failures"] == 1
+    assert stats["pids"] != old_pids
+    assert pool.run_pooled_sync(_double, [5, 6], family="readability") == [10, 12]
+
+
+def test_falls_back_in_process_after_max_restarts(pool, monkeypatch) -> None:
+    # Given
+    monkeypatch.setattr(worker_pool, "METRICS_WORKER_MAX_RESTARTS", 1)
+
+    # When
+    first = pool.run_pooled_sync(_double, [-1, 2], family="readability")
+    second = pool.run_pooled_sync(_double, [-1, 2], family="readability")
+
+    # Then
+    assert first == second == [2, 4]
+    assert not pool.pool_enabled()
+    stats = pool.pool_stats()
+    assert stats == {"workers": 0, "healthy": False, "restarts": 1, "failures": 2, "last_error": stats["last_error"]}
+    assert pool.run_pooled_sync(_double, [3], family="readability") == [6]
+
+
+def test_recovery_waits_for_busy_scoring_thread_before_forking(pool) -> None:
+    # Given: un thread de familia a mitad de un forward, con el lock del modelo tomado
+    started, release = threading.Event(), threading.Event()
+    busy = _executors["relevance"].submit(_busy_forward, started, release)
+    started.wait(5)
+
+    # When: un proceso del pool muere mientras tanto
+    out = []
+    recovery = threading.Thread(target=lambda: out.append(pool.run_pooled_sync(_double, [-1, 2], family="readability")))
+    recovery.start()
+    time.sleep(0.3)
+    waiting = recovery.is_alive()
+    release.set()
+    recovery.join(10)
+    busy.result(5)
+
+    # Then: el pool nuevo se levantó después del forward y hereda el lock abierto
+    assert waiting and out == [[2, 4]]
+    assert pool.pool_stats()["restarts"] == 1
+    assert pool.run_pooled_sync(_lock_free, [0, 0]) == [True, True]
@@ -0,0 +1,119 @@
+# utils/embedding_cache.py
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import torch
+
+
+def content_key(*parts: str) -> str:
+    """Hash sha256 del contenido (y de lo que determine su codificación, p.ej. el modelo)."""
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def tensor_nbytes(value: Any) -> int:
+    """Bytes ocupados por los tensores de ``value`` (tensor o tupla/lista de tensores)."""
+    if isinstance(value, torch.Tensor):
+        return value.element_size() * value.nelement()
+    if isinstance(value, (tuple, list)):
+        return sum(tensor_nbytes(v) for v in value)
+    return 0
+
+
+class LRUTensorCache:
+    """
+    Caché LRU en memoria acotada por bytes, con volcado opcional a disco.
+
+    Las entradas expulsadas de memoria se guardan en ``spill_dir`` (si está
+    definido) con ``torch.save`` y se recuperan desde ahí en un fallo de memoria.
+    """
+
+    def __init__(self, max_bytes: int, spill_dir: Optional[str] = None,
+                 sizeof: Callable[[Any], int] = tensor_nbytes):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir or None
+        self._sizeof = sizeof
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.spill_dir:
+            try:
+                os.makedirs(self.spill_dir, exist_ok=True)
+            except OSError as e:
+                print(f"[cache] volcado a disco deshabilitado ({self.spill_dir}): {e}")
+                self.spill_dir = None
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, f"{key}.pt")
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+        if self.spill_dir:
+            path = self._spill_path(key)
+            if os.path.exists(path):
+                try:
+                    value = torch.load(path, map_location="cpu")
+                except Exception as e:
+                    print(f"[cache] no se pudo leer {path}: {e}")
+                else:
+                    with self._lock:
+                        self.disk_hits += 1
+                    self.put(key, value, spill=False)
+                    return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: Any, spill: bool = True) -> None:
+        size = self._sizeof(value)
+        evicted = []
+        with self._lock:
+            if key in self._data:
+                self._bytes -= self._sizes.pop(key)
+                del self._data[key]
+            self._data[key] = value
+            self._sizes[key] = size
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._data) > 1:
+                old_key, old_value = self._data.popitem(last=False)
+                self._bytes -= self._sizes.pop(old_key)
+                evicted.append((old_key, old_value))
+        if self.spill_dir and spill:
+            for old_key, old_value in evicted:
+                path = self._spill_path(old_key)
+                if os.path.exists(path):
+                    continue
+                try:
+                    tmp = f"{path}.tmp{os.getpid()}"
+                    torch.save(old_value, tmp)
+                    os.replace(tmp, path)
+                except Exception as e:
+                    print(f"[cache] no se pudo volcar {old_key} a disco: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "spill_dir": self.spill_dir,
+            }
@@ -0,0 +1,106 @@
+# utils/executors.py
+import os
+import asyncio
+import threading
+import functools
+import contextlib
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator
+
+import torch
+
+# Presupuesto de threads de CPU repartido entre los dos modelos transformer, que
+# pueden correr a la vez (p.ej. dentro de /loss). torch.set_num_threads aplica al
+# thread que lo llama (OpenMP), así que cada worker fija su propia cuota al iniciar.
+NUM_CPUS = int(os.getenv("TORCH_NUM_THREADS", str(multiprocessing.cpu_count())))
+RELEVANCE_THREADS = int(os.getenv("RELEVANCE_THREADS", str(max(1, NUM_CPUS // 2))))
+FACTUALITY_THREADS = int(os.getenv("FACTUALITY_THREADS", str(max(1, NUM_CPUS - NUM_CPUS // 2))))
+
+
+def _set_threads(n: int) -> None:
+    torch.set_num_threads(n)
+
+
+# Un worker por familia de métricas: cada modelo procesa un batch a la vez y las
+# tres familias avanzan en paralelo sin bloquear el event loop
+_executors = {
+    "relevance": ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix="relevance",
+        initializer=_set_threads, initargs=(RELEVANCE_THREADS,),
+    ),
+    "factuality": ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix="factuality",
+        initializer=_set_threads, initargs=(FACTUALITY_THREADS,),
+    ),
+    "readability": ThreadPoolExecutor(max_workers=1, thread_name_prefix="readability"),
+}
+
+
+async def run_metric(family: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Ejecuta ``fn(*args, **kwargs)`` en el executor de ``family`` y espera el resultado.
+    Con el pool multi-proceso activo (METRICS_WORKERS > 0), las filas se reparten entre
+    los procesos de inferencia.
+    """
+    from utils import worker_pool  # import local: worker_pool importa este módulo
+    if worker_pool.pool_enabled() and not kwargs:
+        return await worker_pool.run_pooled(fn, *args, family=family)
+    return await run_local(family, fn, *args, **kwargs)
+
+
+def run_metric_sync(family: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Versión bloqueante de ``run_metric`` para código fuera del event loop (p.ej. calibración)."""
+    from utils import worker_pool
+    if worker_pool.pool_enabled() and not kwargs:
+        return worker_pool.run_pooled_sync(fn, *args, family=family)
+    return run_local_sync(family, fn, *args, **kwargs)
+
+
+async def run_local(family: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """``fn(*args, **kwargs)`` en el executor de ``family`` del proceso principal, sin pasar por el pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executors[family], functools.partial(fn, *args, **kwargs))
+
+
+def run_local_sync(family: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    if threading.current_thread().name.startswith(f"{family}_"):
+        return fn(*args, **kwargs)
+    return _executors[family].submit(functools.partial(fn, *args, **kwargs)).result()
+
+
+@contextlib.contextmanager
+def paused_executors() -> Iterator[None]:
+    """
+    Ocupa todos los threads de los executors de familia con una tarea que espera y no
+    los suelta hasta salir del bloque. Al entrar, las tareas en curso y en cola ya
+    terminaron: ningún thread tiene tomado un lock de modelo o de caché (p.ej. para
+    hacer fork sin heredar un lock cerrado). Lo que se encole mientras tanto espera.
+    """
+    release = threading.Event()
+    for family, executor in _executors.items():
+        if threading.current_thread().name.startswith(f"{family}_"):
+            continue  # el thread que pausa no puede esperarse a sí mismo
+        holding = threading.Semaphore(0)
+
+        def _hold() -> None:
+            holding.release()
+            release.wait()
+
+        for _ in range(executor._max_workers):
+            executor.submit(_hold)
+        for _ in range(executor._max_workers):
+            holding.acquire()
+    try:
+        yield
+    finally:
+        release.set()
+
+
+def thread_budget() -> dict:
+    return {"total": NUM_CPUS, "relevance": RELEVANCE_THREADS, "factuality": FACTUALITY_THREADS}
+
+
+def shutdown_executors() -> None:
+    for executor in _executors.values():
+        executor.shutdown(wait=False)
@@ -1,7 +1,11 @@
 # utils/factuality.py
 import os
-from typing import List
+import threading
+from typing import List, Optional, Tuple
 import torch
+from nltk.tokenize import sent_tokenize
+
+from utils.embedding_cache import LRUTensorCache, content_key
 
 # Optimizaciones de PyTorch para CPU
 # Detectar número de vCPU automáticamente
@@ -21,11 +25,37 @@ ALIGNSCORE_MODEL = os.getenv("ALIGNSCORE_MODEL", "roberta-base")
 ALIGNSCORE_CKPT = os.getenv("ALIGNSCORE_CKPT",os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models", "AlignScore-base.ckpt")))
 ALIGNSCORE_BATCH = int(os.getenv("ALIGNSCORE_BATCH", "8"))
 ALIGNSCORE_EVAL_MODE = os.getenv("ALIGNSCORE_EVAL_MODE", "nli_sp")
+# Batching por longitud (solo nli_sp): los pares chunk/oración se ordenan por tokens
+# y cada batch se arma hasta ALIGNSCORE_TOKEN_BUDGET tokens (filas x longitud máxima)
+ALIGNSCORE_BUCKETING = os.getenv("ALIGNSCORE_BUCKETING", "1") == "1"
+ALIGNSCORE_TOKEN_BUDGET = int(os.getenv("ALIGNSCORE_TOKEN_BUDGET", str(ALIGNSCORE_BATCH * 512)))
+ALIGNSCORE_CHUNK_WORDS = 350  # mismo tamaño de chunk de contexto que usa AlignScore
+# Caché LRU del preprocesamiento de cada texto original (chunks + token ids), por hash de contenido
+ALIGNSCORE_CONTEXT_CACHE_MAX_MB = float(os.getenv("ALIGNSCORE_CONTEXT_CACHE_MAX_MB", "64"))
 
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 
 _scorer = None
 
+def _context_nbytes(value) -> int:
+    chunks, ids = value
+    return sum(len(c) for c in chunks) + 8 * sum(len(x) for x in ids)
+
+_context_cache = LRUTensorCache(int(ALIGNSCORE_CONTEXT_CACHE_MAX_MB * 1024 * 1024), sizeof=_context_nbytes)
+
+# Contadores de fallas de AlignScore (expuestos en /healthz)
+_error_lock = threading.Lock()
+_error_stats = {"pairs_scored": 0, "pairs_failed": 0, "batch_failures": 0}
+
+def _count(**deltas) -> None:
+    with _error_lock:
+        for k, v in deltas.items():
+            _error_stats[k] += v
+
+def error_stats() -> dict:
+    with _error_lock:
+        return dict(_error_stats)
+
 def _get_scorer():
     global _scorer
     if _scorer is None:
@@ -41,10 +71,118 @@ def _get_scorer():
             )
     return _scorer
 
-def compute_factuality(texts_original: List[str], texts_generated: List[str]) -> List[float]:
+def _split_context(premise: str) -> List[str]:
+    """Chunks de ~350 palabras formados por oraciones completas (igual que AlignScore nli_sp)."""
+    sents = sent_tokenize(premise) or [""]
+    n_chunk = len(premise.strip().split()) // ALIGNSCORE_CHUNK_WORDS + 1
+    n_chunk = max(len(sents) // n_chunk, 1)
+    return [" ".join(sents[i:i + n_chunk]) for i in range(0, len(sents), n_chunk)]
+
+def _encode_pair(tokenizer, premise_ids: List[int], hypo_ids: List[int]) -> dict:
+    """Igual que tokenizer(premise, hypo, truncation="only_first"), a partir de token ids ya calculados."""
+    kwargs = dict(max_length=tokenizer.model_max_length, padding=False)
+    try:
+        return tokenizer.prepare_for_model(premise_ids, hypo_ids, truncation="only_first", **kwargs)
+    except Exception:
+        # la oración del resumen por sí sola supera el máximo
+        return tokenizer.prepare_for_model(premise_ids, hypo_ids, truncation=True, **kwargs)
+
+def _token_ids(tokenizer, texts: List[str]) -> List[List[int]]:
+    return tokenizer(texts, add_special_tokens=False)["input_ids"] if texts else []
+
+def _context_chunks(tokenizer, premise: str) -> Tuple[List[str], List[List[int]]]:
+    """Chunks del texto original y sus token ids; se reutilizan entre resúmenes del mismo original."""
+    if _context_cache.max_bytes <= 0:
+        chunks = _split_context(premise)
+        return chunks, _token_ids(tokenizer, chunks)
+    key = content_key(tokenizer.name_or_path, str(ALIGNSCORE_CHUNK_WORDS), premise)
+    cached = _context_cache.get(key)
+    if cached is None:
+        chunks = _split_context(premise)
+        cached = (chunks, _token_ids(tokenizer, chunks))
+        _context_cache.put(key, cached)
+    return cached
+
+def context_cache_stats() -> dict:
+    return _context_cache.stats()
+
+def _score_rows(scorer, rows: List[dict]) -> List[float]:
     """
-    Devuelve puntajes AlignScore en [0,1] por par. 
-    Si algún texto está vacío (tras strip) o AlignScore falla en un par, retorna 0.0 para ese caso.
+    Probabilidad de 'aligned' por fila. Las filas se ordenan por longitud y se
+    agrupan según ALIGNSCORE_TOKEN_BUDGET, con padding solo hasta la fila más larga
+    del batch; el resultado vuelve en el orden de entrada.
+    """
+    inferencer = scorer.model
+    order = sorted(range(len(rows)), key=lambda i: len(rows[i]["input_ids"]), reverse=True)
+    out = [0.0] * len(rows)
+    start = 0
+    while start < len(order):
+        max_len = len(rows[order[start]]["input_ids"])
+        size = max(1, ALIGNSCORE_TOKEN_BUDGET // max(1, max_len))
+        idx = order[start:start + size]
+        batch = inferencer.tokenizer.pad([rows[i] for i in idx], padding=True, return_tensors="pt").to(DEVICE)
+        logits = inferencer.model(batch).tri_label_logits
+        probs = torch.softmax(logits, dim=-1)[:, 0].cpu().tolist()
+        for i, p in zip(idx, probs):
+            out[i] = float(p)
+        start += len(idx)
+    return out
+
+def _score_nli_sp_bucketed(scorer, contexts: List[str], claims: List[str]) -> List[float]:
+    """
+    Equivalente a AlignScorer.score en modo nli_sp, pero agrupando en batches las
+    filas (chunk de contexto, oración del resumen) de todos los pares a la vez.
+    """
+    tokenizer = scorer.model.tokenizer
+    rows, spans = [], []
+    for premise, hypo in zip(contexts, claims):
+        _, chunk_ids = _context_chunks(tokenizer, premise)
+        sent_ids = _token_ids(tokenizer, sent_tokenize(hypo))
+        spans.append((len(rows), len(chunk_ids), len(sent_ids)))
+        rows.extend(_encode_pair(tokenizer, c, s) for c in chunk_ids for s in sent_ids)
+
+    probs = torch.tensor(_score_rows(scorer, rows)) if rows else torch.empty(0)
+    scores = []
+    for start, n_chunks, n_sents in spans:
+        if n_sents == 0:
+            scores.append(0.0)
+            continue
+        mat = probs[start:start + n_chunks * n_sents].view(n_chunks, n_sents)
+        # por oración: mejor chunk de soporte; luego promedio sobre oraciones
+        scores.append(float(mat.max(dim=0).values.mean()))
+    return scores
+
+def _score_batch(scorer, contexts: List[str], claims: List[str]) -> List[float]:
+    # Usar no_grad para inferencia más rápida
+    with torch.no_grad():
+        if ALIGNSCORE_BUCKETING and ALIGNSCORE_EVAL_MODE == "nli_sp":
+            return _score_nli_sp_bucketed(scorer, contexts=contexts, claims=claims)
+        return scorer.score(contexts=contexts, claims=claims)
+
+def _score_isolating_errors(scorer, contexts: List[str], claims: List[str]) -> Tuple[List[Optional[float]], List[Optional[str]]]:
+    """
+    Evalúa el batch completo; si falla, lo divide en mitades recursivamente hasta
+    aislar los pares que fallan, de modo que el resto conserva su puntaje.
+    """
+    try:
+        out = _score_batch(scorer, contexts, claims)
+        return [float(x) for x in out], [None] * len(contexts)
+    except Exception as e:
+        _count(batch_failures=1)
+        if len(contexts) == 1:
+            msg = f"{type(e).__name__}: {e}"
+            print(f"[factuality] AlignScore error: {msg}")
+            return [None], [msg]
+    mid = len(contexts) // 2
+    s1, e1 = _score_isolating_errors(scorer, contexts[:mid], claims[:mid])
+    s2, e2 = _score_isolating_errors(scorer, contexts[mid:], claims[mid:])
+    return s1 + s2, e1 + e2
+
+def compute_factuality_detailed(texts_original: List[str], texts_generated: List[str]) -> Tuple[List[Optional[float]], List[Optional[str]]]:
+    """
+    Puntajes AlignScore en [0,1] por par y, en paralelo, el error de cada par.
+    Pares con algún texto vacío (tras strip) puntúan 0.0; los pares en que AlignScore
+    falla quedan en None con su mensaje de error (None en los pares sin error).
     """
     assert len(texts_generated) == len(texts_original), "texts_generated y texts_original deben tener la misma longitud"
     scorer = _get_scorer()
@@ -55,25 +193,32 @@ def compute_factuality(texts_original: List[str], texts_generated: List[str]) ->
     n = len(ctx)
 
     valid_idx = [i for i in range(n) if ctx[i] and hyp[i]]
-    scores = [0.0] * n  # Para pares inválidos o con error
+    scores: List[Optional[float]] = [0.0] * n  # Para pares inválidos
+    errors: List[Optional[str]] = [None] * n
 
     if not valid_idx:
-        return scores  
+        return scores, errors
+
+    # Evalúa sólo pares válidos y reubica resultados
+    out, errs = _score_isolating_errors(
+        scorer,
+        contexts=[ctx[i] for i in valid_idx],
+        claims=[hyp[i] for i in valid_idx]
+    )
+    for j, i in enumerate(valid_idx):
+        scores[i] = out[j]
+        errors[i] = errs[j]
+    failed = sum(e is not None for e in errs)
+    _count(pairs_scored=len(valid_idx) - failed, pairs_failed=failed)
+    return scores, errors
 
-    try:
-        # Evalúa sólo pares válidos y reubica resultados
-        # Usar no_grad para inferencia más rápida
-        with torch.no_grad():
-            out = scorer.score(
-                contexts=[ctx[i] for i in valid_idx],
-                claims=[hyp[i] for i in valid_idx]
-            )
-        for j, i in enumerate(valid_idx):
-            scores[i] = float(out[j])
-    except Exception as e:
-        print(f"[factuality] AlignScore error: {e}")
-
-    return scores
+def compute_factuality(texts_original: List[str], texts_generated: List[str]) -> List[float]:
+    """
+    Devuelve puntajes AlignScore en [0,1] por par. 
+    Si algún texto está vacío (tras strip) o AlignScore falla en un par, retorna 0.0 para ese caso.
+    """
+    scores, _ = compute_factuality_detailed(texts_original, texts_generated)
+    return [0.0 if s is None else s for s in scores]
 
 def warmup_factuality():
     """Descarga recursos necesarios."""
@@ -1,12 +1,67 @@
-from typing import List, Dict
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Tuple
 
+import numpy as np
 import textstat
+from pyphen import Pyphen
 
 _WARMED = False
 
+# Same tokenization rules as textstat (en_US, punctuation incl. apostrophes removed)
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SENTENCE_RE = re.compile(r"\b[^.!?]+[.!?]*", re.UNICODE)
+_DALE_WORD_RE = re.compile(r"[\w\='‘’]+")
+
+_PYPHEN = Pyphen(lang="en_US")
+_EASY_WORDS = frozenset(
+    line.strip()
+    for line in (Path(textstat.__file__).parent / "resources" / "en" / "easy_words.txt")
+    .read_text(encoding="utf-8").splitlines()
+)
+
+
+@lru_cache(maxsize=200_000)
+def _syllables(word: str) -> int:
+    """Syllables of a lowercased, punctuation-free word (pyphen hyphenation points + 1)."""
+    return len(_PYPHEN.positions(word)) + 1
+
+
+def _text_counts(text: str) -> Tuple[int, int, int, int, int]:
+    """Single pass over ``text``: (sentences, words, syllables, polysyllables, difficult words)."""
+    words = syllables = poly = 0
+    for raw in text.split():
+        word = _PUNCT_RE.sub("", raw.lower())
+        if not word:
+            continue
+        n = _syllables(word)
+        words += 1
+        syllables += n
+        if n >= 3:
+            poly += 1
+
+    # sentences with <= 2 words are not counted (textstat.sentence_count)
+    sentences = _SENTENCE_RE.findall(text)
+    short = sum(1 for s in sentences if len(_PUNCT_RE.sub("", s).split()) <= 2)
+    n_sentences = max(1, len(sentences) - short)
+
+    difficult = sum(1 for w in set(_DALE_WORD_RE.findall(text.lower())) if w not in _EASY_WORDS)
+    return n_sentences, words, syllables, poly, difficult
+
+
+def _legacy_round(x: np.ndarray, points: int) -> np.ndarray:
+    # textstat's rounding: half away from zero
+    p = 10 ** points
+    return np.floor(x * p + np.copysign(0.5, x)) / p
+
+
 def compute_readability(texts: List[str]) -> Dict[str, List[float]]:
     """Compute FKGL, SMOG (short-text) and Dale-Chall for each text.
 
+    Each text is tokenized once; the three scores are derived from the shared
+    counts with the same formulas and rounding as textstat.
+
     Returns a dict with arrays aligned to input order:
     {
       "fkgl": [...],
@@ -14,22 +69,35 @@ def compute_readability(texts: List[str]) -> Dict[str, List[float]]:
       "dale_chall": [...]
     }
     """
-    fkgl: List[float] = []
-    smog: List[float] = []
-    dale: List[float] = []
+    if not texts:
+        return {"fkgl": [], "smog": [], "dale_chall": []}
+
+    counts = np.array([_text_counts(t) for t in texts], dtype=np.float64)
+    sentences, words, syllables, poly, difficult = counts.T
+    has_words = words > 0
+    safe_words = np.where(has_words, words, 1.0)
+
+    asl = _legacy_round(words / sentences, 1)
+    asw = np.where(has_words, _legacy_round(syllables / safe_words, 1), 0.0)
+
+    fkgl = _legacy_round(0.39 * asl + 11.8 * asw - 15.59, 1)
+
+    smog = np.where(
+        sentences >= 3,
+        _legacy_round(1.043 * np.power(30 * (poly / sentences), 0.5) + 3.1291, 1),
+        0.0,
+    )
 
-    for text in texts:
-        fkgl.append(float(textstat.flesch_kincaid_grade(text)))
-        smog.append(float(textstat.smog_index(text)))
-        dale.append(float(textstat.dale_chall_readability_score(text)))
+    per_difficult = 100 - (words - difficult) / safe_words * 100
+    dale = 0.1579 * per_difficult + 0.0496 * asl
+    dale = np.where(per_difficult > 5, dale + 3.6365, dale)
+    dale = np.where(has_words, _legacy_round(dale, 2), 0.0)
 
-    return {"fkgl": fkgl, "smog": smog, "dale_chall": dale}
+    return {"fkgl": fkgl.tolist(), "smog": smog.tolist(), "dale_chall": dale.tolist()}
 
 
 def warmup_readability() -> None:
-    _ = textstat.flesch_kincaid_grade("warmup")
-    _ = textstat.smog_index("warmup")
-    _ = textstat.dale_chall_readability_score("warmup")
+    _ = compute_readability(["warmup"])
     global _WARMED
     _WARMED = True
 
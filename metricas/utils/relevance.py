@@ -1,41 +1,137 @@
 import os
-from typing import List
+import threading
+from typing import Dict, List, Tuple
+from collections import defaultdict
 from fastapi import HTTPException
-from bert_score import score as bertscore
+from bert_score import BERTScorer
+from bert_score.utils import get_bert_embedding, greedy_cos_idf
+from torch.nn.utils.rnn import pad_sequence
 import torch
 
+from utils.embedding_cache import LRUTensorCache, content_key
+
 BERTSCORE_MODEL = os.getenv("BERTSCORE_MODEL", "roberta-large")
+BERTSCORE_BATCH = int(os.getenv("BERTSCORE_BATCH", "16"))
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 
+# Caché de embeddings de los textos originales (referencias): un mismo documento
+# fuente se compara contra muchas generaciones, así que solo el candidato pasa por el modelo
+RELEVANCE_CACHE_MAX_MB = float(os.getenv("RELEVANCE_CACHE_MAX_MB", "512"))
+RELEVANCE_CACHE_DIR = os.getenv("RELEVANCE_CACHE_DIR", "")  # vacío = sin volcado a disco
+
 _WARMED = False
+_scorer = None
+_scorer_lock = threading.Lock()  # creación del scorer
+_score_lock = threading.Lock()   # un forward a la vez sobre el modelo residente
+_ref_cache = LRUTensorCache(int(RELEVANCE_CACHE_MAX_MB * 1024 * 1024), spill_dir=RELEVANCE_CACHE_DIR)
+
+def _get_scorer() -> BERTScorer:
+    """Modelo y tokenizer de BERTScore cargados una sola vez y reutilizados entre requests."""
+    global _scorer
+    if _scorer is None:
+        with _scorer_lock:
+            if _scorer is None:
+                _scorer = BERTScorer(
+                    model_type=BERTSCORE_MODEL,
+                    device=DEVICE,
+                    lang="en",
+                    batch_size=BERTSCORE_BATCH,
+                    idf=False,
+                    rescale_with_baseline=False,
+                )
+    return _scorer
+
+def _idf_dict(scorer: BERTScorer) -> Dict[int, float]:
+    # Igual que BERTScorer.score con idf=False: peso 1 salvo CLS/SEP
+    idf = defaultdict(lambda: 1.0)
+    idf[scorer._tokenizer.sep_token_id] = 0
+    idf[scorer._tokenizer.cls_token_id] = 0
+    return idf
+
+def _embed(scorer: BERTScorer, texts: List[str]) -> Dict[str, Tuple[torch.Tensor, torch.Tensor]]:
+    """
+    Embeddings contextuales por token (ya normalizados L2) y pesos idf de cada texto.
+    Se agrupan por longitud, como hace bert_score, para reducir padding.
+    """
+    idf_dict = _idf_dict(scorer)
+    order = sorted(set(texts), key=lambda t: len(t.split(" ")), reverse=True)
+    out = {}
+    for start in range(0, len(order), BERTSCORE_BATCH):
+        batch = order[start:start + BERTSCORE_BATCH]
+        embs, masks, padded_idf = get_bert_embedding(
+            batch, scorer._model, scorer._tokenizer, idf_dict, device=scorer.device, all_layers=False
+        )
+        embs = embs.cpu()
+        embs = embs / torch.norm(embs, dim=-1, keepdim=True)
+        masks = masks.cpu()
+        padded_idf = padded_idf.cpu()
+        for i, text in enumerate(batch):
+            n = int(masks[i].sum().item())
+            # clone: no retener el tensor del batch completo desde la caché
+            out[text] = (embs[i, :n].clone(), padded_idf[i, :n].clone())
+    return out
+
+def _pad(stats: List[Tuple[torch.Tensor, torch.Tensor]], device) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    embs = [e.to(device) for e, _ in stats]
+    idfs = [i.to(device) for _, i in stats]
+    lens = torch.tensor([e.size(0) for e in embs], dtype=torch.long)
+    emb_pad = pad_sequence(embs, batch_first=True, padding_value=2.0)
+    idf_pad = pad_sequence(idfs, batch_first=True)
+    mask = torch.arange(int(lens.max())).expand(len(lens), -1) < lens.unsqueeze(1)
+    return emb_pad, mask.to(device), idf_pad
 
 def compute_relevance(texts_original: List[str], texts_generated: List[str]) -> List[float]:
     """
     Relevance anclada al ORIGINAL:
     comparamos cands=generated vs refs=original. Devuelve F1 en [0,1].
+    Los embeddings de los originales se toman de la caché cuando ya se calcularon.
     """
     if len(texts_original) != len(texts_generated):
         raise HTTPException(status_code=400, detail="los conjuntos deben tener la misma longitud.")
 
-    _, _, F1 = bertscore(
-        cands=texts_generated,
-        refs=texts_original,
-        model_type=BERTSCORE_MODEL,
-        device=DEVICE,
-        lang="en",
-        idf=False,                 
-        rescale_with_baseline=False,
-        verbose=False
-    )
+    if not texts_generated:
+        return []
+
+    scorer = _get_scorer()
+    with _score_lock, torch.inference_mode():
+        use_cache = _ref_cache.max_bytes > 0
+        ref_keys = {t: content_key(scorer.hash, t) for t in texts_original}
+        stats = {}
+        if use_cache:
+            for text, key in ref_keys.items():
+                cached = _ref_cache.get(key)
+                if cached is not None:
+                    stats[text] = cached
+
+        missing_refs = [t for t in ref_keys if t not in stats]
+        new_stats = _embed(scorer, missing_refs + [t for t in texts_generated if t not in stats])
+        if use_cache:
+            for text in missing_refs:
+                _ref_cache.put(ref_keys[text], new_stats[text])
+        stats.update(new_stats)
+
+        device = next(scorer._model.parameters()).device
+        F1 = []
+        for start in range(0, len(texts_original), BERTSCORE_BATCH):
+            refs = texts_original[start:start + BERTSCORE_BATCH]
+            cands = texts_generated[start:start + BERTSCORE_BATCH]
+            _, _, F = greedy_cos_idf(
+                *_pad([stats[t] for t in refs], device),
+                *_pad([stats[t] for t in cands], device),
+                False,
+            )
+            F1.extend(F.cpu().tolist())
     return [float(x) for x in F1]
 
+def relevance_cache_stats() -> dict:
+    return _ref_cache.stats()
+
 def warmup_relevance() -> None:
     global _WARMED
     if _WARMED:
         return
     try:
-        bertscore(["warmup"], ["warmup"], model_type=BERTSCORE_MODEL, device=DEVICE, lang="en",
-                  idf=False, rescale_with_baseline=False, verbose=False)
+        compute_relevance(["warmup"], ["warmup"])
         _WARMED = True
     except Exception as e:
         print(f"[relevance warmup] {type(e).__name__}: {e}")
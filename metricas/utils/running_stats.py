@@ -0,0 +1,124 @@
+# utils/running_stats.py
+import math
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+class RunningStats:
+    """
+    Estadísticos suficientes combinables de una métrica: count, mean y M2 (Welford),
+    más un sketch opcional de cuantiles (centroides ponderados, estilo t-digest).
+
+    ``update`` agrega valores nuevos en O(len(values)) y ``merge`` combina dos
+    resultados calculados por separado (chunks, shards en otras máquinas) con la
+    fórmula de Chan et al., sin volver a recorrer los datos originales.
+    """
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0,
+                 sketch: Optional[List[List[float]]] = None, sketch_size: int = 100):
+        self.count = int(count)
+        self.mean = float(mean)
+        self.m2 = float(m2)
+        self.sketch_size = int(sketch_size)
+        # lista ordenada de [valor, peso]; None si no se guardan cuantiles
+        self.sketch = [[float(v), float(w)] for v, w in sketch] if sketch is not None else None
+        if self.sketch is None and self.sketch_size > 0 and self.count == 0:
+            self.sketch = []
+
+    # ---- momentos ----
+    def _merge_moments(self, count: int, mean: float, m2: float) -> None:
+        if count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = count, mean, m2
+            return
+        n = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / n
+        self.m2 += m2 + delta * delta * self.count * count / n
+        self.count = n
+
+    def update(self, values: Iterable[float]) -> "RunningStats":
+        """Agrega un lote de valores (los NaN se ignoran)."""
+        arr = np.asarray(values if isinstance(values, np.ndarray) else list(values), dtype=float).ravel()
+        arr = arr[~np.isnan(arr)]
+        if arr.size == 0:
+            return self
+        mean = float(arr.mean())
+        self._merge_moments(int(arr.size), mean, float(((arr - mean) ** 2).sum()))
+        if self.sketch is not None:
+            self.sketch.extend([float(v), 1.0] for v in np.sort(arr))
+            self._compress()
+        return self
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        """Combina ``other`` en este acumulador (el sketch se conserva solo si ambos lo tienen)."""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.sketch = [[v, w] for v, w in other.sketch] if other.sketch is not None else None
+        elif self.sketch is not None and other.sketch is not None:
+            self.sketch.extend([v, w] for v, w in other.sketch)
+            self._compress()
+        else:
+            self.sketch = None
+        self._merge_moments(other.count, other.mean, other.m2)
+        return self
+
+    @property
+    def variance(self) -> float:
+        """Varianza muestral (ddof=1)."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        """Desviación estándar muestral (ddof=1), igual que ``np.std(x, ddof=1)``."""
+        return math.sqrt(max(self.variance, 0.0))
+
+    # ---- cuantiles ----
+    def _compress(self) -> None:
+        """Agrupa centroides vecinos con el límite de peso de t-digest (δ = ``sketch_size``): más resolución en las colas."""
+        sk = sorted(self.sketch, key=lambda c: c[0])
+        if len(sk) <= self.sketch_size:
+            self.sketch = sk
+            return
+        total = sum(w for _, w in sk)
+        out = [list(sk[0])]
+        seen = 0.0  # peso acumulado antes del centroide actual
+        for v, w in sk[1:]:
+            cur = out[-1]
+            q = (seen + (cur[1] + w) / 2.0) / total
+            # límite de peso por centroide: 4*N*q*(1-q)/δ (t-digest)
+            limit = max(1.0, 4.0 * total * q * (1.0 - q) / self.sketch_size)
+            if cur[1] + w <= limit:
+                cur[0] = (cur[0] * cur[1] + v * w) / (cur[1] + w)
+                cur[1] += w
+            else:
+                seen += cur[1]
+                out.append([v, w])
+        self.sketch = out
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Cuantil aproximado ``q`` ∈ [0, 1]; None si no hay sketch o está vacío."""
+        if not self.sketch:
+            return None
+        values = np.array([v for v, _ in self.sketch])
+        weights = np.array([w for _, w in self.sketch])
+        # posición de cada centroide: centro de su masa acumulada
+        centers = (np.cumsum(weights) - weights / 2.0) / weights.sum()
+        return float(np.interp(q, centers, values))
+
+    # ---- serialización ----
+    def to_dict(self) -> Dict:
+        data = {"count": self.count, "mean": self.mean, "m2": self.m2}
+        if self.sketch is not None:
+            data["sketch"] = self.sketch
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict, sketch_size: int = 100) -> "RunningStats":
+        return cls(
+            count=data.get("count", 0), mean=data.get("mean", 0.0), m2=data.get("m2", 0.0),
+            sketch=data.get("sketch"), sketch_size=sketch_size,
+        )
@@ -0,0 +1,178 @@
+# utils/worker_pool.py
+import os
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, Optional
+
+import torch
+
+from utils.executors import NUM_CPUS, paused_executors, run_local, run_local_sync
+
+# Modo multi-proceso (0 = todo en el proceso del servicio, como hasta ahora).
+# Con N > 0 las métricas se reparten entre N procesos de inferencia con
+# METRICS_WORKER_THREADS threads de PyTorch cada uno.
+METRICS_WORKERS = int(os.getenv("METRICS_WORKERS", "0"))
+METRICS_WORKER_THREADS = int(os.getenv("METRICS_WORKER_THREADS", str(max(1, NUM_CPUS // max(1, METRICS_WORKERS)))))
+# Filas mínimas por sub-batch: por debajo no compensa repartir un request entre procesos
+METRICS_WORKER_MIN_ROWS = int(os.getenv("METRICS_WORKER_MIN_ROWS", "4"))
+# Veces que se vuelve a levantar el pool si un proceso muere (OOM, segfault); agotadas,
+# las métricas se calculan en el proceso principal
+METRICS_WORKER_MAX_RESTARTS = int(os.getenv("METRICS_WORKER_MAX_RESTARTS", "3"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_workers = 0
+_threads = 0
+_pids: List[int] = []
+_requested = (0, 0)  # (workers, threads) pedidos en start_worker_pool
+_restarts = 0
+_failures = 0
+_last_error: Optional[str] = None
+_recover_lock = threading.Lock()
+
+
+def _init_worker(threads: int) -> None:
+    torch.set_num_threads(threads)
+    torch.set_grad_enabled(False)
+
+
+def _ping(_: int) -> int:
+    return os.getpid()
+
+
+def start_worker_pool(workers: int = METRICS_WORKERS, threads: int = METRICS_WORKER_THREADS) -> bool:
+    """
+    Levanta ``workers`` procesos de inferencia. Debe llamarse DESPUÉS de cargar los
+    modelos (warmup): los procesos se crean con fork y heredan los pesos ya cargados
+    como memoria compartida copy-on-write, que nunca se escribe en inferencia.
+    """
+    global _pool, _workers, _threads, _pids, _requested
+    if workers <= 0 or _pool is not None:
+        return _pool is not None
+    _requested = (workers, threads)
+    # los tokenizers rápidos ya usaron su pool de threads en el warmup; en los hijos no
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    _pool = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_worker, initargs=(threads,),
+    )
+    _workers, _threads = workers, threads
+    # fuerza el fork de todos los procesos ahora, con el servicio todavía sin tráfico
+    list(_pool.map(_ping, range(workers)))
+    _pids = sorted(_pool._processes)
+    return True
+
+
+def pool_enabled() -> bool:
+    return _pool is not None
+
+
+def _slices(n: int) -> List[slice]:
+    parts = max(1, min(_workers, n // max(1, METRICS_WORKER_MIN_ROWS)))
+    bounds = [round(k * n / parts) for k in range(parts + 1)]
+    return [slice(a, b) for a, b in zip(bounds, bounds[1:])]
+
+
+def _submit(pool: ProcessPoolExecutor, fn: Callable[..., Any], *args) -> List[Future]:
+    """Parte los argumentos (listas alineadas por fila) en sub-batches contiguos, uno por proceso."""
+    n = len(args[0])
+    return [pool.submit(fn, *(a[s] for a in args)) for s in _slices(n)]
+
+
+def _recover(pool: ProcessPoolExecutor, error: BaseException) -> None:
+    """
+    Descarta un pool con algún proceso muerto y levanta uno nuevo, hasta
+    METRICS_WORKER_MAX_RESTARTS veces; después el pool queda desactivado.
+    El fork se hace con los executors de familia vacíos y pausados: un thread a mitad
+    de un forward dejaría sus locks (``_score_lock``, caché de embeddings) cerrados
+    para siempre en los procesos nuevos.
+    """
+    global _pool, _workers, _pids, _restarts, _failures, _last_error
+    with _recover_lock:
+        if _pool is not pool:  # otro request ya lo reemplazó
+            return
+        _failures += 1
+        _last_error = str(error) or type(error).__name__
+        print(f"[workers] pool caído: {_last_error}")
+        pool.shutdown(wait=False, cancel_futures=True)
+        _pool, _workers, _pids = None, 0, []
+        if _restarts >= METRICS_WORKER_MAX_RESTARTS:
+            print("[workers] sin reinicios disponibles: métricas en el proceso principal")
+            return
+        _restarts += 1
+        try:
+            with paused_executors():
+                start_worker_pool(*_requested)
+            print(f"[workers] pool reiniciado ({_restarts}/{METRICS_WORKER_MAX_RESTARTS}): {pool_stats()}")
+        except Exception as e:
+            _pool, _workers, _pids = None, 0, []
+            _last_error = f"reinicio fallido: {e}"
+            print(f"[workers] {_last_error}")
+
+
+def _merge(parts: List[Any]) -> Any:
+    """Concatena en orden resultados por fila: listas, tuplas de listas o dicts de listas."""
+    first = parts[0]
+    if isinstance(first, dict):
+        return {k: [v for p in parts for v in p[k]] for k in first}
+    if isinstance(first, tuple):
+        return tuple(_merge([p[i] for p in parts]) for i in range(len(first)))
+    return [v for p in parts for v in p]
+
+
+async def run_pooled(fn: Callable[..., Any], *args, family: Optional[str] = None) -> Any:
+    """
+    ``fn(*args)`` repartido entre los procesos; el resultado conserva el orden de las filas.
+    Si el pool está caído (BrokenProcessPool) se reconstruye y el request se calcula en el
+    executor de ``family`` del proceso principal.
+    """
+    pool = _pool
+    try:
+        if pool is None:
+            raise BrokenProcessPool("pool desactivado")
+        futures = _submit(pool, fn, *args)
+        return _merge(list(await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))))
+    except BrokenProcessPool as e:
+        if pool is not None:
+            # el fork y el ping de los procesos nuevos no bloquean el event loop
+            await asyncio.to_thread(_recover, pool, e)
+    if family is None:
+        return await asyncio.to_thread(fn, *args)
+    return await run_local(family, fn, *args)
+
+
+def run_pooled_sync(fn: Callable[..., Any], *args, family: Optional[str] = None) -> Any:
+    pool = _pool
+    try:
+        if pool is None:
+            raise BrokenProcessPool("pool desactivado")
+        return _merge([f.result() for f in _submit(pool, fn, *args)])
+    except BrokenProcessPool as e:
+        if pool is not None:
+            _recover(pool, e)
+    return fn(*args) if family is None else run_local_sync(family, fn, *args)
+
+
+def pool_stats() -> dict:
+    if _pool is not None:
+        stats = {
+            "workers": _workers, "threads_per_worker": _threads, "pids": list(_pids),
+            "healthy": not getattr(_pool, "_broken", False),
+        }
+    elif _requested[0] > 0:
+        # se agotaron los reinicios: las métricas corren en el proceso principal
+        stats = {"workers": 0, "healthy": False}
+    else:
+        return {"workers": 0}
+    stats.update(restarts=_restarts, failures=_failures, last_error=_last_error)
+    return stats
+
+
+def shutdown_worker_pool() -> None:
+    global _pool, _workers, _pids, _requested
+    _requested = (0, 0)
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool, _workers, _pids = None, 0, []
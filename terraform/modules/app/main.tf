@@ -68,6 +68,10 @@ resource "aws_ecs_service" "this" {
   desired_count   = var.desired_count
   launch_type     = "FARGATE"
 
+  # Tiempo en que ECS ignora los health checks del target group tras iniciar una tarea
+  # (descarga del modelo, carga y warmup antes de que /readyz responda 200)
+  health_check_grace_period_seconds = var.health_check_grace_period_seconds
+
   network_configuration {
     subnets          = var.subnet_ids
     security_groups  = [aws_security_group.app.id]
@@ -60,3 +60,9 @@ variable "execution_role_arn" {
   description = "ARN of the ECS task execution role (required for Fargate)"
   default     = null
 }
+
+variable "health_check_grace_period_seconds" {
+  type        = number
+  description = "Segundos en que ECS ignora los health checks del load balancer al arrancar una tarea"
+  default     = 0
+}
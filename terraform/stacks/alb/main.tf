@@ -38,8 +38,11 @@ resource "aws_lb_target_group" "generador" {
   vpc_id      = data.terraform_remote_state.vpc.outputs.vpc_id
   target_type = "ip"
 
+  # HTTP contra /readyz: no se enruta tráfico a tareas cuyo modelo aún no cargó
   health_check {
-    protocol            = "TCP"
+    protocol            = "HTTP"
+    path                = "/readyz"
+    matcher             = "200"
     port                = "traffic-port"
     interval            = 30
     timeout             = 10
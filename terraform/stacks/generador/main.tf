@@ -66,6 +66,7 @@ module "app" {
   task_memory      = var.memory
   desired_count    = var.desired_count
   target_group_arn = data.terraform_remote_state.alb.outputs.nlb_generador_target_group_arn
+  health_check_grace_period_seconds = var.health_check_grace_period_seconds
   env_vars         = var.env_vars
 }
 
@@ -7,6 +7,11 @@ variable "container_port" { type = number }
 variable "cpu"            { type = number }
 variable "memory"         { type = number }
 variable "desired_count"  { type = number }
+# /readyz responde 503 mientras se descarga el modelo de S3, se carga y se hace el warmup
+variable "health_check_grace_period_seconds" {
+  type    = number
+  default = 900
+}
 variable "env_vars" {
   type    = map(string)
   default = {}